@@ -4,10 +4,31 @@
 import pygame
 import numpy as np
 import math
+import os
+import sys
+import argparse
 import threading
 import time
+import concurrent.futures
+import collections
+import struct
+import tempfile
+import zlib
+import decimal
+import json
+import csv
+import platform
+import socket
+import multiprocessing
+import traceback
 from PIL import Image
 
+# numba is optional, without it the numba render engine isn't available
+try:
+    import numba
+except ImportError:
+    numba = None
+
 complexSpaceTransformation = np.array(
     [[200.0, 0.0, 500.0],
      [0.0, 200.0, 300.0],
@@ -16,28 +37,199 @@ complexSpaceTransformation = np.array(
 displayComplexPlane = True
 maxIterations = 1000
 
+# The window is only drawn again when something on it changed (new tiles, the status, the view or
+# a key), at most uiFrameRate times per second, so an idle window doesn't take the cores of the render
+uiFrameRate = 60
+screenDirty = True
+
+# The text surfaces of the overlay and the lines of the axis are made again only when they change
+overlayTextCache = {}
+overlayTextCacheSize = 64
+complexPlaneLines = None
+complexPlaneKey = None
+complexPlaneTickSpacing = 4
+
 renderingThreadLock = threading.Lock()
 txtThreadLock = threading.Lock()
 
+# Each render is a job on its own thread, a new job cancels the running one between tiles
+# and waits for it to stop, so only one job draws on the surfaces at a time
+renderThread = None
+renderCancelEvent = None
+
+# Auto rendering, the changes of the view are coalesced and rendered when they stop for autoRenderDelay
+# seconds, while they keep coming (keys held down) only a 1/8 resolution preview is rendered
+autoRendering = True
+autoRenderDelay = 0.15
+renderRequestTime = None
+renderPreviewPending = False
+renderPreview = False
+
+# Holding the navigation keys repeats them
+keyRepeatDelay = 250
+keyRepeatInterval = 40
+navigationKeys = (pygame.K_w, pygame.K_s, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN)
+
+# Process pool used to render the tiles, the worker count can be set with --workers
+renderWorkers = os.cpu_count() or 1
+renderTileSize = 64
+renderPool = None
+
+# Distributed rendering, with an address (host:port or unix:/path) the tiles are sent to the render
+# workers that connect to it (python mandelbrot_set.py --worker ADDRESS) instead of the local processes
+# A worker sends a heartbeat every heartbeatInterval seconds, after workerTimeout seconds without
+# hearing from it its tiles go to the other workers
+renderCoordinatorAddress = None
+heartbeatInterval = 1.0
+workerTimeout = 10.0
+
+# The render waits for the tasks this many seconds at a time and checks if it was cancelled in between,
+# with the distributed pool a task can wait forever when there are no workers
+renderWaitInterval = 0.1
+
+# Engine used to iterate the points, see renderEngines
+renderEngine = 'numpy'
+
+# Progressive rendering shows 1/8, 1/4 and 1/2 resolution previews before the full image
+progressiveRendering = True
+progressiveSteps = [8, 4, 2, 1]
+
+# Tiles of iterations saved on disk, so the places already visited render almost instantly
+# When the cache gets bigger than tileCacheMaxBytes the least recently used tiles are removed
+tileCacheEnabled = True
+tileCacheDir = './cache'
+tileCacheMaxBytes = 512 * 1024 * 1024
+tileCacheIndex = None
+tileCacheHits = 0
+tileCacheMisses = 0
+
+# Optional Mariani-Silver subdivision, cells with the same iterations on the whole border are
+# filled without iterating the inside, they start with subdivisionStartSize pixels and are split
+# in 4 down to subdivisionMinSize pixels (both powers of 2)
+subdivisionRendering = False
+subdivisionStartSize = 64
+subdivisionMinSize = 4
+# Every pass of the subdivision takes as long as its slowest pixel, so the still images are
+# subdivided in blocks of bands with about this many pixels instead of band by band
+subdivisionBlockPixels = 1 << 20
+
+# Iterations done after the escape to get the smooth iteration count, see getSmoothOffset
+smoothExtraIterations = 3
+
+# Adaptive max iterations, the limit starts from the zoom and a sample of the pixels is iterated
+# doubling it while more than adaptiveEscapeFraction of the samples escape in the last doubling
+adaptiveIterations = False
+adaptiveBaseIterations = 100
+adaptiveMaxIterations = 1000000
+adaptiveSampleCount = 4096
+adaptiveEscapeFraction = 0.001
+
+# Anti-aliasing, only the pixels on edges (a channel changes by more than antialiasingThreshold to a
+# neighbor) get more samples: a jittered antialiasingGrid x antialiasingGrid grid inside the pixel
+antialiasing = False
+antialiasingGrid = 3
+antialiasingThreshold = 24
+antialiasingChunkSize = 16384
+
+# Past this scale (pixels per unit) the float64 coordinates of neighbor pixels collapse,
+# so the view is kept relative to a high precision origin and rendered with perturbation
+deepZoomThreshold = 1e12
+deepZoomOrigin = (decimal.Decimal(0), decimal.Decimal(0))
+deepZoomMoveStep = 2.0
+referenceOrbitCache = {}
+# The distributed workers only use the reference orbits sent by the coordinator, they don't read files
+referenceOrbitFiles = True
+
+# The reference orbit grows referenceOrbitChunkSize points at a time and stops at referenceOrbitMaxLength
+# points, so a high max iterations doesn't allocate it all at once. The pixels that get to its end
+# are rebased (see iterateComplexGridPerturbation), so they still iterate up to any limit
+referenceOrbitChunkSize = 1 << 16
+referenceOrbitMaxLength = 1 << 20
+# The reference orbit of the last render is kept as ((origin, precision, max iterations), orbit file),
+# the renders with the same origin (previews, panning, recoloring) use it again
+lastReferenceOrbit = None
+
+# Timings and throughput of the last render, shown on the screen with the i key
+# and written to the trace file (--trace) after every render when it is set
+renderStats = None
+showRenderStats = False
+renderTracePath = None
+renderStatsFields = ['frame', 'width', 'height', 'maxIterations', 'engine', 'deepZoom',
+    'referenceOrbitSeconds', 'iterationMapSeconds', 'hueSeconds', 'rasterizeSeconds', 'totalSeconds',
+    'renderedPixels', 'renderedIterations', 'pixelsPerSecond', 'iterationsPerSecond',
+    'workerUtilization', 'cacheHits', 'cacheMisses', 'cacheHitRate', 'antialiasedPixels', 'antialiasSeconds']
+
+# Amount of colors of the interpolated pallete
+palleteLutSize = 16384
+
+# Palletes that can be chosen with the c key and how the iterations are mapped to the pallete (m key)
+# Changing them only colors the last iteration map again
+palleteDir = './palletes'
+palleteFilePath = './palletes/pallete3.bmp'
+colorMappings = ['histogram', 'linear', 'log']
+colorMapping = 'histogram'
+
+# Histograms covering less iterations than this are turned into a table indexed by the iterations
+cumulativeTableSize = 1 << 22
+
+# Pixels of each chunk of the hue and the colors
+hueChunkSize = 1 << 16
+
+# Zoom animations, every key frame is rendered with up to animationKeyScale times the pixels
+# of a frame and the next frames are taken from it until they zoom in that much
+animationKeyScale = 2.0
+
+# Snapshots of the iteration map, the .msetz files are compressed and the .mset ones
+# are kept raw so they can be memory mapped when loaded
+snapshotDir = './snapshots'
+snapshotMagic = b'MSNAP'
+snapshotVersion = 1
+snapshotPath = None
+
+# Last rendered iteration map and its view, used by the image tracking
+lastIterationMap = None
+lastSmoothMap = None
+lastKnown = None
+lastTransformation = None
+lastMaxIterations = None
+lastDeepZoomOrigin = None
+lastHistogram = None
+lastSubsamples = None
+
+# The pixels of the last iteration map that hit its limit as (x, y, last z real, last z imaginary),
+# so a higher limit continues their orbits instead of starting again. The z is NaN for the
+# periodic points, the ones inside the cardioid or the bulb aren't kept (see isInsideCardioidOrBulb)
+lastOrbits = None
+
+# Two sets of (iterations, smooth, known) maps with the size of the window, a render fills the one
+# that isn't the last iteration map so the last one can still be reused
+renderBuffers = None
+# The float32 hue of the window for the renders and the recolors
+hueBuffer = None
+
 # define a main function
 def main():
     global screen
     global renderingSurface
     global offscreenSurface
     global defaultFont
-    global rendering
     global status
     global WINDOW_W
     global WINDOW_H
     global moveSpeed
     global zoomSpeed
 
-    rendering = False
     status = 'Ready'
     WINDOW_W = 800
     WINDOW_H = 600
     moveSpeed = 5.0
     zoomSpeed = 5.0
+
+    # The window opens with the size of the snapshot
+    snapshot = None
+    if (snapshotPath is not None):
+        snapshot = loadSnapshot(snapshotPath)
+        WINDOW_W, WINDOW_H = snapshot[0]['width'], snapshot[0]['height']
      
     # initialize the pygame module
     pygame.init()
@@ -62,19 +254,56 @@ def main():
     calculateTransformationMatrix()
 
     # Load Color Pallete
-    loadPallete('./palletes/pallete3.bmp')
+    loadPallete(palleteFilePath)
+
+    pygame.key.set_repeat(keyRepeatDelay, keyRepeatInterval)
+    heldKeys = set()
+    if (snapshot is not None):
+        showSnapshot(snapshot[0], snapshot[1])
+    elif (autoRendering):
+        request_render()
      
     # main loop
+    clock = pygame.time.Clock()
     while running:
         # event handling, gets all event from the event queue
         for event in pygame.event.get():
+            # Anything but moving the mouse can change the window
+            if (event.type != pygame.MOUSEMOTION):
+                invalidateScreen()
             # only do something if the event is of type QUIT
             if event.type == pygame.QUIT:
                 # change the value to False, to exit the main loop
                 running = False
+            if event.type == pygame.KEYUP:
+                heldKeys.discard(event.key)
             if event.type == pygame.KEYDOWN:
+                # Only the navigation keys do something when they are repeated
+                if (event.key in heldKeys and event.key not in navigationKeys):
+                    continue
+                heldKeys.add(event.key)
                 if event.key == pygame.K_r:
                     request_render()
+                if event.key == pygame.K_p:
+                    toggleProgressiveRendering()
+                if event.key == pygame.K_b:
+                    toggleSubdivisionRendering()
+                if event.key == pygame.K_e:
+                    nextRenderEngine()
+                if event.key == pygame.K_i:
+                    toggleRenderStats()
+                if event.key == pygame.K_a:
+                    toggleAutoRendering()
+                if event.key == pygame.K_c:
+                    nextPallete()
+                if event.key == pygame.K_m:
+                    nextColorMapping()
+                if event.key == pygame.K_k:
+                    saveLastSnapshot()
+                if event.key == pygame.K_x:
+                    toggleAdaptiveIterations()
+                if event.key == pygame.K_g:
+                    toggleAntialiasing()
                 if event.key == pygame.K_w:
                     zoomDir(1)
                 if event.key == pygame.K_s:
@@ -93,46 +322,63 @@ def main():
                     moveDir(0, 1)
             if event.type == pygame.VIDEORESIZE:
                 resizeWin(event.w, event.h)
+
+        updateAutoRender()
+        if (screenDirty):
+            draw()
+        clock.tick(uiFrameRate)
+
+    cancelRender()
+    shutdownRenderPool()
+    removeLastReferenceOrbit()
         
-        draw()
-        
+# The render thread calls it too, after drawing on the rendering surface or changing the status
+def invalidateScreen():
+    global screenDirty
+    screenDirty = True
+    return
+
 def draw():
-    global screenBoundaries
-    global unitSize
-    global ok
-    global moveSpeed
-    global zoomSpeed
+    global screenDirty
 
+    # Cleared before drawing, so a change while drawing is drawn on the next frame
+    screenDirty = False
     screen.fill((0, 0, 0))
 
-    #screen.set_at((10, 10), (255, 255, 255))
-    screenBoundaries = getScreenBoundariesInComplexSpace()
-    unitSize = getUnitInComplexSpace()
-
     renderingThreadLock.acquire()
     screen.blit(renderingSurface, (0, 0))
     renderingThreadLock.release()
 
     txtThreadLock.acquire()
-    infoTxt = defaultFont.render('Press r to start rendering', False, (255, 255, 255))
-    speedZoom = defaultFont.render('Move Speed: ' + "{:.2f}".format(moveSpeed) + 
+    lines = ['Auto Rendering (a to turn off)' if (autoRendering) else 'Press r to start rendering',
+        'Move Speed: ' + "{:.2f}".format(moveSpeed) + 
         ' - Zoom Speed: ' + "{:.2f}".format(zoomSpeed) + 
-        ' - Zoom: ' + "{:.2f}".format(complexSpaceTransformation[0][0] / 100.0) + 'x' + 
-        ' - Max Iterations: ' + "{:.2f}".format(maxIterations), False, (255, 255, 255))
-        
-    statusTxt = defaultFont.render(status, False, (255, 255, 255))
+        ' - Zoom: ' + "{:.4g}".format(complexSpaceTransformation[0][0] / 100.0) + 'x' + 
+        ' - Max Iterations: ' + "{:.2f}".format(maxIterations),
+        status]
+    if (showRenderStats):
+        lines += getRenderStatsText()
     txtThreadLock.release()
 
-    screen.blit(infoTxt, (10, 10))
-    screen.blit(speedZoom, (10, 25))
-    screen.blit(statusTxt, (10, 40))
+    for (i, line) in enumerate(lines):
+        screen.blit(getOverlayText(line), (10, 10 + i * 15))
     
-    if (displayComplexPlane):
+    # On deep zoom the axis are far away from the screen
+    if (displayComplexPlane and not isDeepZoom(complexSpaceTransformation)):
         drawComplexPlane()
     
     pygame.display.flip()
     return
 
+def getOverlayText(text):
+    textSurface = overlayTextCache.get(text)
+    if (textSurface is None):
+        if (len(overlayTextCache) >= overlayTextCacheSize):
+            overlayTextCache.clear()
+        textSurface = defaultFont.render(text, False, (255, 255, 255))
+        overlayTextCache[text] = textSurface
+    return textSurface
+
 def resizeWin(w, h):
     global WINDOW_W
     global WINDOW_H
@@ -142,23 +388,98 @@ def resizeWin(w, h):
     WINDOW_W = w
     WINDOW_H = h
 
+    # The running job is cancelled before the surfaces change size
+    rerender = isRenderWanted()
+    if (renderCancelEvent is not None):
+        renderCancelEvent.set()
+
     screen = pygame.display.set_mode((WINDOW_W, WINDOW_H),
                                 pygame.RESIZABLE)
+    renderingThreadLock.acquire()
     renderingSurface = pygame.Surface((WINDOW_W, WINDOW_H))
     offscreenSurface = pygame.Surface((WINDOW_W, WINDOW_H))
     renderingSurface.fill((100, 0, 0))
     offscreenSurface.fill((0, 0, 0))
+    renderingThreadLock.release()
 
+    if (rerender):
+        scheduleRender()
     return
 
-def request_render():
-    renderingThreadLock.acquire()
-    if (rendering):
+# Starts a render job for the current view, the running job (if any) is cancelled
+# and the new one starts after it stops, reusing the tiles it finished
+# A preview job only renders the 1/8 resolution level
+def request_render(preview = False):
+    global renderThread
+    global renderCancelEvent
+    global renderRequestTime
+    global renderPreviewPending
+    global renderPreview
+
+    if (not preview):
+        renderRequestTime = None
+        renderPreviewPending = False
+    renderPreview = preview
+    if (renderCancelEvent is not None):
+        renderCancelEvent.set()
+    renderCancelEvent = threading.Event()
+    renderThread = threading.Thread(target = render, args = (renderCancelEvent, renderThread, preview))
+    renderThread.start()
+    return
+
+def isRendering():
+    return renderThread is not None and renderThread.is_alive()
+
+# The view has to be rendered again after a change when auto rendering is on
+# or when the last view didn't finish rendering
+def isRenderWanted():
+    return autoRendering or isRendering() or renderRequestTime is not None
+
+# When the view changes the running job is already stale, so it is cancelled
+# and a new render is scheduled for when the view stops changing
+# A preview is left to finish, so something is shown while the keys are held
+def restartRender():
+    if (not isRenderWanted()):
         return
-    renderingThreadLock.release()
+    scheduleRender()
+    return
+
+def scheduleRender():
+    global renderRequestTime
+    global renderPreviewPending
+    if (renderCancelEvent is not None and not renderPreview):
+        renderCancelEvent.set()
+    renderRequestTime = time.time()
+    renderPreviewPending = autoRendering
+    return
+
+# Called every frame, starts the scheduled render after autoRenderDelay seconds without changes
+# and meanwhile keeps rendering previews of the latest view whenever the last one is done
+def updateAutoRender():
+    global renderPreviewPending
+    if (renderRequestTime is None):
+        return
+    if (time.time() - renderRequestTime >= autoRenderDelay):
+        request_render()
+    elif (renderPreviewPending and not isRendering()):
+        renderPreviewPending = False
+        request_render(True)
+    return
+
+def toggleAutoRendering():
+    global autoRendering
+    autoRendering = not autoRendering
+    setStatus("Auto Rendering: " + ("On" if autoRendering else "Off"))
+    if (autoRendering):
+        scheduleRender()
+    return
 
-    renderThred = threading.Thread(target = render, args=())
-    renderThred.start()
+def cancelRender():
+    if (renderCancelEvent is not None):
+        renderCancelEvent.set()
+    if (renderThread is not None):
+        renderThread.join()
+    return
 
 def setStatus(statusText):
     global status
@@ -166,86 +487,1417 @@ def setStatus(statusText):
     txtThreadLock.acquire()
     status = statusText
     txtThreadLock.release()
+    invalidateScreen()
     return
 
-def render():
-    renderingThreadLock.acquire()
-    rendering = True
-    renderingThreadLock.release()
+# Runs a render job on the render thread, after the previous one stops
+# When a worker process dies (killed or crashed) the process pool can't be used anymore, so it is shut
+# down and the next render starts a new one, the errors of the job are shown on the status
+def render(cancelEvent, previousThread = None, preview = False):
+    if (previousThread is not None):
+        previousThread.join()
+    if (cancelEvent.is_set()):
+        return
 
-    iterationMap = [[0 for x in range(WINDOW_H)] for y in range(WINDOW_W)]
-    numIterationsPerPixel = [0 for v in range(maxIterations + 1)]
-    for i in range(0, maxIterations): numIterationsPerPixel[i] = 0
-
-    # Create the iteration map
-    for x in range(0, WINDOW_W):
-        progress = (x / (WINDOW_W * 1.0)) * 100.0
-        setStatus("Generating Iteration Map: " + "{:.2f}".format(progress) + "%")
-        for y in range(0, WINDOW_H):
-            complexCoord = projectToComplex(x, y)
-            iterationMap[x][y] = iterateComplex(complexCoord[0], complexCoord[1])
-            iterations = iterationMap[x][y]
-            numIterationsPerPixel[iterations] += 1
-
-    # Calculate total amount of iterations
-    setStatus("Calculating Total Interations")
-    total = 0
-    for i in range(0, maxIterations):
-        total += numIterationsPerPixel[i]
-    #if (total == 0): total = 1; # avoid division by zero
-    
-    # Create hue based on total amount iterations
-    hue = [[0 for x in range(WINDOW_H)] for y in range(WINDOW_W)]
-    for x in range(0, WINDOW_W):
-        progress = (x / (WINDOW_W * 1.0)) * 100.0
-        setStatus("Calculating Hue Based on Histogram: " + "{:.2f}".format(progress) + "%")
-
-        for y in range(0, WINDOW_H):
-            iteration = iterationMap[x][y]
-            if (iteration == maxIterations):
-                hue[x][y] = None
-            else:
-                for i in range(0, iteration):
-                    hue[x][y] += numIterationsPerPixel[i] / total
+    try:
+        renderView(cancelEvent, preview)
+    except concurrent.futures.BrokenExecutor:
+        shutdownRenderPool()
+        setStatus("Render Failed: a worker process stopped, render again to start new workers")
+        traceback.print_exc()
+    except Exception as error:
+        setStatus("Render Failed: " + str(error))
+        traceback.print_exc()
+    return
+
+def renderView(cancelEvent, preview = False):
+    # The view is copied so moving while rendering doesn't mix two views
+    width, height = WINDOW_W, WINDOW_H
+    transformation = complexSpaceTransformation.copy()
+    transformationInverse = complexSpaceTransformationTransposedInverse.copy()
+    maxIter = maxIterations
+    origin = deepZoomOrigin
+    engine = renderEngine
+    antialias = antialiasing and not preview
+    cacheHits, cacheMisses = tileCacheHits, tileCacheMisses
+    startTime = time.perf_counter()
+
+    # The previews keep the max iterations of the last render
+    if (adaptiveIterations and not preview):
+        setStatus("Sampling the Max Iterations")
+        maxIter = calculateAdaptiveIterations(transformation, width, height)
+        if (cancelEvent.is_set()):
+            return
+        setAdaptiveMaxIterations(maxIter)
+
+    # On deep zoom all of the pixels are rendered relative to the orbit of the center
+    reference = None
+    if (isDeepZoom(transformation)):
+        setStatus("Calculating Reference Orbit")
+        reference = getReferenceOrbit(origin, transformation, maxIter, cancelEvent)
+    referenceOrbitTime = time.perf_counter()
+    if (cancelEvent.is_set()):
+        return
+
+    # Pixels that are still on the screen since the last render are reused,
+    # including the ones finished by a cancelled render
+    iterationMap, smoothMap, known = getRenderBuffers(width, height, getIterationsDtype(maxIter))
+    orbits = []
+    resume = reuseLastIterationMap(iterationMap, smoothMap, known, transformation, transformationInverse, maxIter, origin, orbits)
+
+    # The full resolution tiles are aligned to the complex plane so they can be cached
+    cacheView = getTileCacheView(transformation) if (reference is None) else None
+    if (cacheView is None):
+        tiles = getTiles(width, height, renderTileSize)
+    else:
+        tiles = getCacheTiles(width, height, renderTileSize, cacheView, maxIter)
+        loadCachedTiles(iterationMap, smoothMap, known, tiles)
+
+    # Create the iteration map, with progressive rendering a coarse version is
+    # rendered first and every level reuses the pixels from the previous one
+    # The tiles of a preview are colored with the histogram of the last render while the level isn't done
+    steps = progressiveSteps if (progressiveRendering and not known.any()) else [1]
+    histogram = None
+    if (preview):
+        steps = [progressiveSteps[0]]
+        histogram = lastHistogram
+
+    skippedPixels = 0
+    renderedPixels = 0
+    renderedIterations = 0
+    workerSeconds = 0.0
+    for step in steps:
+        if (step == 1):
+            levelTiles = tiles
+        else:
+            levelTiles = getTiles((width + step - 1) // step, (height + step - 1) // step, renderTileSize)
+        levelSkippedPixels, levelPixels, levelRenderedIterations, levelWorkerSeconds = renderLevel(iterationMap, smoothMap, known, step, levelTiles, transformationInverse, maxIter, histogram, reference, cancelEvent, resume, orbits)
+        skippedPixels += levelSkippedPixels
+        renderedPixels += levelPixels
+        renderedIterations += levelRenderedIterations
+        workerSeconds += levelWorkerSeconds
+        if (cancelEvent.is_set()):
+            break
+        levelIterations = iterationMap[::step, ::step]
+        histogram = calculateHistogram(levelIterations)
+        if (step > 1):
+            blitPreviewTile(0, 0, levelIterations, smoothMap[::step, ::step], step, maxIter, histogram)
+
+    setLastIterationMap(iterationMap, smoothMap, known, transformation, maxIter, origin, joinOrbits(orbits))
+    if (cancelEvent.is_set()):
+        return
+    if (preview):
+        setStatus("Preview")
+        return
+    iterationMapTime = time.perf_counter()
+
+    # Create hue based on the cumulative histogram of the iterations
+    setStatus("Calculating Hue Based on Histogram")
+    setLastHistogram(histogram)
+    hue = calculateHue(iterationMap, smoothMap, histogram, maxIter, colorMapping, getHueBuffer(width, height))
+    hueTime = time.perf_counter()
     
-    # Transform to complex plane space and get the collor from the pallete
-    for x in range(0, WINDOW_W):
-        progress = (x / (WINDOW_W * 1.0)) * 100.0
-        setStatus("Rasterizing: " + "{:.2f}".format(progress) + "%")
-        for y in range(0, WINDOW_H):
-            hueVal = hue[x][y]
-            outColor = (0, 0, 0)
-            if (hueVal is not None):
-                if (hueVal > 1.0): hueVal = 1.0
-                if (hueVal < 0.0): hueVal = 0.0
-                pColor = getPalleteColor(hueVal)
-                outColor = (pColor[0], pColor[1], pColor[2])
-
-            offscreenSurface.set_at((x, y), outColor)
+    # Get the collor of each pixel from the pallete, the colors are written straight into the pixels
+    # of the offscreen surface (only the render thread changes it, the screen shows the rendering surface)
+    setStatus("Rasterizing")
+    surface = offscreenSurface
+    if (surface.get_size() != (width, height)):
+        return
+    colors = pygame.surfarray.pixels3d(surface)
+    calculateColors(hue, palleteColors, colors)
+    rasterizeTime = time.perf_counter()
+
+    antialiasedPixels = 0
+    if (antialias):
+        setStatus("Anti-aliasing")
+        subsamples = calculateSubsamples(colors, 0, 0, transformationInverse, maxIter, reference, cancelEvent)
+        if (subsamples is None):
+            return
+        blendSubsamples(colors, subsamples, histogram, maxIter)
+        setLastSubsamples(subsamples)
+        antialiasedPixels = len(subsamples[0])
+    antialiasTime = time.perf_counter()
+    # The surface can't be blitted while its pixels are referenced
+    del colors
     
     renderingThreadLock.acquire()
-    renderingSurface.blit(offscreenSurface, (0, 0))
-    rendering = False
+    if (cancelEvent.is_set() or surface is not offscreenSurface):
+        renderingThreadLock.release()
+        return
+    renderingSurface.blit(surface, (0, 0))
     renderingThreadLock.release()
+    invalidateScreen()
+    endTime = time.perf_counter()
 
-    setStatus("Ready")
+    iterationMapSeconds = iterationMapTime - referenceOrbitTime
+    cacheHits, cacheMisses = tileCacheHits - cacheHits, tileCacheMisses - cacheMisses
+    setRenderStats({
+        'width': width, 'height': height, 'maxIterations': maxIter, 'engine': engine, 'deepZoom': reference is not None,
+        'referenceOrbitSeconds': referenceOrbitTime - startTime, 'iterationMapSeconds': iterationMapSeconds,
+        'hueSeconds': hueTime - iterationMapTime, 'rasterizeSeconds': (rasterizeTime - hueTime) + (endTime - antialiasTime), 'totalSeconds': endTime - startTime,
+        'renderedPixels': renderedPixels, 'renderedIterations': renderedIterations,
+        'pixelsPerSecond': renderedPixels / max(iterationMapSeconds, 1e-9),
+        'iterationsPerSecond': renderedIterations / max(iterationMapSeconds, 1e-9),
+        'workerUtilization': workerSeconds / max(iterationMapSeconds * getRenderWorkerCount(), 1e-9) if (workerSeconds > 0) else 0.0,
+        'cacheHits': cacheHits, 'cacheMisses': cacheMisses,
+        'cacheHitRate': cacheHits / (cacheHits + cacheMisses * 1.0) if (cacheHits + cacheMisses > 0) else None,
+        'antialiasedPixels': antialiasedPixels, 'antialiasSeconds': antialiasTime - rasterizeTime})
+
+    if (subdivisionRendering):
+        setStatus("Ready - Subdivision skipped " + "{:.2f}".format(skippedPixels / (width * height * 1.0) * 100.0) + "% of the pixels")
+    else:
+        setStatus("Ready")
+    return
+
+# Keeps the stats of the last render and appends them to the trace file,
+# as CSV when it ends with .csv and as JSON lines otherwise
+def setRenderStats(stats):
+    global renderStats
+    stats['frame'] = renderStats['frame'] + 1 if (renderStats is not None) else 1
+    renderStats = stats
+    if (renderTracePath is None):
+        return
+
+    try:
+        if (renderTracePath.lower().endswith('.csv')):
+            newFile = not os.path.exists(renderTracePath) or os.path.getsize(renderTracePath) == 0
+            with open(renderTracePath, 'a', newline = '') as traceFile:
+                writer = csv.DictWriter(traceFile, fieldnames = renderStatsFields)
+                if (newFile):
+                    writer.writeheader()
+                writer.writerow(stats)
+        else:
+            with open(renderTracePath, 'a') as traceFile:
+                traceFile.write(json.dumps(dict([(field, stats[field]) for field in renderStatsFields])) + '\n')
+    except OSError as e:
+        setStatus("Couldn't write the trace: " + str(e))
+    return
+
+# Lines of text shown on the screen with the stats of the last render
+def getRenderStatsText():
+    if (renderStats is None):
+        return ['No render stats yet']
+    stats = renderStats
+    cacheText = 'Cache hits: ' + ("{:.0f}".format(stats['cacheHitRate'] * 100.0) + '%' if (stats['cacheHitRate'] is not None) else '-')
+    return [
+        'Render ' + str(stats['frame']) + ' (' + stats['engine'] + '): ' + "{:.3f}".format(stats['totalSeconds']) + 's' +
+            (' - Reference Orbit: ' + "{:.3f}".format(stats['referenceOrbitSeconds']) + 's' if (stats['deepZoom']) else '') +
+            ' - Iteration Map: ' + "{:.3f}".format(stats['iterationMapSeconds']) + 's' +
+            ' - Hue: ' + "{:.3f}".format(stats['hueSeconds']) + 's' +
+            ' - Rasterize: ' + "{:.3f}".format(stats['rasterizeSeconds']) + 's' +
+            (' - Anti-aliasing: ' + "{:.3f}".format(stats['antialiasSeconds']) + 's (' + str(stats['antialiasedPixels']) + ' pixels)' if (stats['antialiasedPixels'] > 0) else ''),
+        "{:.2f}".format(stats['pixelsPerSecond'] / 1e6) + ' MPixels/s' +
+            ' - ' + "{:.1f}".format(stats['iterationsPerSecond'] / 1e6) + ' MIterations/s' +
+            ' - Workers Busy: ' + "{:.0f}".format(stats['workerUtilization'] * 100.0) + '%' +
+            ' - ' + cacheText]
+
+def toggleRenderStats():
+    global showRenderStats
+    showRenderStats = not showRenderStats
+    return
+
+# The iterations are stored in the smallest type that holds maxIter
+def getIterationsDtype(maxIter):
+    if (maxIter < 2 ** 16):
+        return np.dtype(np.uint16)
+    if (maxIter < 2 ** 32):
+        return np.dtype(np.uint32)
+    return np.dtype(np.uint64)
+
+# Cleared maps for a render, they are only allocated again when the size of the window or the type
+# of the iterations change
+def getRenderBuffers(width, height, dtype):
+    global renderBuffers
+    if (renderBuffers is None or renderBuffers[0][0].shape != (width, height) or renderBuffers[0][0].dtype != dtype):
+        renderBuffers = None
+        renderBuffers = [(np.zeros((width, height), dtype = dtype), np.zeros((width, height), dtype = np.float32), np.zeros((width, height), dtype = bool))
+                         for i in range(2)]
+    buffers = renderBuffers[1] if (renderBuffers[0][0] is lastIterationMap) else renderBuffers[0]
+    for buffer in buffers:
+        buffer.fill(0)
+    return buffers
+
+# The hue of the window is written over every time, it's only allocated again when the size changes
+def getHueBuffer(width, height):
+    global hueBuffer
+    if (hueBuffer is None or hueBuffer.shape != (width, height)):
+        hueBuffer = None
+        hueBuffer = np.empty((width, height), dtype = np.float32)
+    return hueBuffer
+
+def setLastIterationMap(iterationMap, smoothMap, known, transformation, maxIter, origin, orbits = None):
+    global lastIterationMap
+    global lastSmoothMap
+    global lastKnown
+    global lastTransformation
+    global lastMaxIterations
+    global lastDeepZoomOrigin
+    global lastSubsamples
+    global lastOrbits
+    lastIterationMap = iterationMap
+    lastSmoothMap = smoothMap
+    lastKnown = known
+    lastTransformation = transformation
+    lastMaxIterations = maxIter
+    lastDeepZoomOrigin = origin
+    lastSubsamples = None
+    lastOrbits = orbits
+    return
+
+# The orbits come in pieces (from the tiles and the last render), an empty list gives empty arrays
+def joinOrbits(orbits):
+    if (not orbits):
+        return (np.zeros(0, dtype = np.int32), np.zeros(0, dtype = np.int32), np.zeros(0), np.zeros(0))
+    return tuple(np.concatenate([orbit[i] for orbit in orbits]) for i in range(4))
+
+def setLastSubsamples(subsamples):
+    global lastSubsamples
+    lastSubsamples = subsamples
+    return
+
+def setLastHistogram(histogram):
+    global lastHistogram
+    lastHistogram = histogram
+    return
+
+# Image tracking, when the view only moved by whole pixels since the last render
+# the last iteration map is shifted into the new one and only the exposed area is left to render
+# With other max iterations the pixels that escaped before both limits keep their iterations,
+# when the limit goes down the rest is inside the set and when it goes up only the pixels
+# that hit the old limit are rendered again, continuing from their last z
+# The orbits of the last map that are still useful go to the orbits list, and it returns the orbits
+# to continue as (x, y, last z real, last z imaginary, start) sorted by x, or None
+def reuseLastIterationMap(iterationMap, smoothMap, known, transformation, transformationInverse, maxIter, origin, orbits):
+    if (lastIterationMap is None or lastDeepZoomOrigin != origin):
+        return
+    if (not np.array_equal(lastTransformation[:, :2], transformation[:, :2])):
+        return
+
+    offset = transformation[:2, 2] - lastTransformation[:2, 2]
+    dx, dy = int(round(offset[0])), int(round(offset[1]))
+    if (abs(offset[0] - dx) > 1e-6 or abs(offset[1] - dy) > 1e-6):
+        return
+
+    # New pixel (x, y) was the old pixel (x - dx, y - dy)
+    lastW, lastH = lastIterationMap.shape
+    w, h = iterationMap.shape
+    x0, x1 = max(0, dx), min(w, lastW + dx)
+    y0, y1 = max(0, dy), min(h, lastH + dy)
+    if (x0 >= x1 or y0 >= y1):
+        return
+
+    iterationMap[x0:x1, y0:y1] = lastIterationMap[x0 - dx:x1 - dx, y0 - dy:y1 - dy]
+    smoothMap[x0:x1, y0:y1] = lastSmoothMap[x0 - dx:x1 - dx, y0 - dy:y1 - dy]
+    known[x0:x1, y0:y1] = lastKnown[x0 - dx:x1 - dx, y0 - dy:y1 - dy]
+
+    # Orbits of the pixels still on the screen, the ones that never escape stay inside with any limit
+    # and the others are only good for the same limit or to continue to a higher one
+    resume = None
+    orbitX, orbitY, lastX, lastY = lastOrbits if (lastOrbits is not None) else joinOrbits([])
+    orbitX, orbitY = orbitX + dx, orbitY + dy
+    visible = (orbitX >= x0) & (orbitX < x1) & (orbitY >= y0) & (orbitY < y1)
+    orbitX, orbitY, lastX, lastY = orbitX[visible], orbitY[visible], lastX[visible], lastY[visible]
+    inside = np.isnan(lastX)
+    if (maxIter == lastMaxIterations):
+        orbits.append((orbitX, orbitY, lastX, lastY))
+    else:
+        orbits.append((orbitX[inside], orbitY[inside], lastX[inside], lastY[inside]))
+
+    if (maxIter > lastMaxIterations):
+        known[x0:x1, y0:y1] &= iterationMap[x0:x1, y0:y1] < lastMaxIterations
+        iterationMap[orbitX[inside], orbitY[inside]] = maxIter
+        known[orbitX[inside], orbitY[inside]] = True
+        # The points inside the cardioid or the bulb are found again a few rows at a time (on deep
+        # zoom the coordinates are relative to the origin, so they are rendered again)
+        if (not isDeepZoom(transformation)):
+            for chunk in getChunks((x1 - x0, y1 - y0)):
+                px, py = np.nonzero(~known[x0:x1, y0:y1][chunk])
+                px += x0 + chunk.start
+                py += y0
+                interior = isInsideCardioidOrBulb(px * transformationInverse[0][0] + py * transformationInverse[1][0] + transformationInverse[2][0],
+                    px * transformationInverse[0][1] + py * transformationInverse[1][1] + transformationInverse[2][1])
+                iterationMap[px[interior], py[interior]] = maxIter
+                smoothMap[px[interior], py[interior]] = 0.0
+                known[px[interior], py[interior]] = True
+        if (not inside.all()):
+            order = np.argsort(orbitX[~inside], kind = 'stable')
+            resume = (orbitX[~inside][order], orbitY[~inside][order], lastX[~inside][order], lastY[~inside][order], lastMaxIterations)
+    elif (maxIter < lastMaxIterations):
+        hitLimit = iterationMap[x0:x1, y0:y1] >= maxIter
+        iterationMap[x0:x1, y0:y1][hitLimit] = maxIter
+        smoothMap[x0:x1, y0:y1][hitLimit] = 0.0
+
+    # Shows the old image on its new place while the rest is rendered
+    renderingThreadLock.acquire()
+    for surface in (offscreenSurface, renderingSurface):
+        surface.scroll(dx, dy)
+        surface.fill((0, 0, 0), pygame.Rect(0, 0, w, y0))
+        surface.fill((0, 0, 0), pygame.Rect(0, y1, w, h - y1))
+        surface.fill((0, 0, 0), pygame.Rect(0, 0, x0, h))
+        surface.fill((0, 0, 0), pygame.Rect(x1, 0, w - x1, h))
+    renderingThreadLock.release()
+    return resume
+
+# Histogram of the iteration map as (iteration values, amount of pixels)
+# Only the values that happen are stored, so it doesn't depend on maxIterations
+# It is counted a chunk at a time, because np.unique sorts a copy of the array
+def calculateHistogram(iterationMap):
+    histogram = (np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64))
+    for chunk in getChunks(iterationMap.shape):
+        values, counts = np.unique(iterationMap[chunk], return_counts = True)
+        histogram = mergeHistograms(histogram, (values.astype(np.int64), counts))
+    return histogram
+
+# The hue of a pixel is the fraction of the pixels (not counting the ones inside the set)
+# that escaped in less iterations than it, it is taken from the cumulative histogram
+# With the smooth offsets the hue is interpolated between the cumulative histogram of the
+# smooth iteration count rounded down and up, so there are no bands between the iterations
+# Pixels inside the set get NaN
+# The linear and log mappings spread the smooth iteration counts of the pixels outside of the set
+# evenly (or by their logarithm) between the smallest and the biggest of them instead
+# The hue is written to out when it's given (a float32 array with the shape of the iteration map)
+def calculateHue(iterationMap, smoothMap, histogram, maxIter, mapping = 'histogram', out = None):
+    values, counts = histogram
+    if (mapping != 'histogram'):
+        return calculateRangeHue(iterationMap, smoothMap, values, maxIter, mapping == 'log', out)
+    outside = values < maxIter
+    total = counts[outside].sum()
+    if (total == 0): total = 1 # avoid division by zero
+
+    # Fraction of the pixels with less iterations than each value, when the histogram covers a small
+    # range of iterations it is a table indexed by the iterations, otherwise the position of the
+    # iterations in the histogram is searched (the extra value at the end is for iterations
+    # bigger than all of the values in the histogram)
+    # The table starts one iteration before the histogram for the smooth counts rounded down
+    if (values[-1] - values[0] < cumulativeTableSize):
+        first = values[0] - 1
+        cumulative = np.zeros(values[-1] - first + 2)
+        cumulative[values - first + 1] = counts
+        cdf = (np.cumsum(cumulative) / float(total)).astype(np.float32)
+    else:
+        cdf = (np.concatenate(([0], np.cumsum(counts))) / float(total)).astype(np.float32)
+
+    # The hue is float32 and it is calculated a few rows at a time, so the temporary arrays
+    # don't grow with the size of the image
+    hue = np.empty(iterationMap.shape, dtype = np.float32) if (out is None) else out
+    for chunk in getChunks(iterationMap.shape):
+        iterations = iterationMap[chunk]
+        if (smoothMap is None):
+            lower = iterations
+        else:
+            # The offsets are bigger than -1, so the smooth count rounded down is the iterations or one less
+            below = smoothMap[chunk] < 0
+            lower = iterations - below
+
+        if (values[-1] - values[0] < cumulativeTableSize):
+            index = np.subtract(lower, first, dtype = np.int64)
+            np.clip(index, 0, len(cdf) - 2, out = index)
+            upperIndex = index + 1
+        else:
+            index = np.searchsorted(values, lower)
+            upperIndex = np.searchsorted(values, lower + 1)
+
+        chunkHue = hue[chunk]
+        np.take(cdf, index, out = chunkHue, mode = 'clip')
+        if (smoothMap is not None):
+            step = cdf[upperIndex]
+            step -= chunkHue
+            step *= smoothMap[chunk] + below
+            chunkHue += step
+        chunkHue[iterations >= maxIter] = np.nan
+    return hue
+
+# Slices of the first axis of an array of the shape with about hueChunkSize elements each
+def getChunks(shape):
+    rows = max(1, hueChunkSize // max(1, int(np.prod(shape[1:]))))
+    return [slice(first, first + rows) for first in range(0, shape[0], rows)]
+
+# Like calculateHue, the hue is float32 and the smooth counts are calculated a few rows at a time
+def calculateRangeHue(iterationMap, smoothMap, values, maxIter, logarithmic, out = None):
+    outside = values[values < maxIter]
+    low, high = (outside[0], outside[-1] + 1.0) if (len(outside) > 0) else (0.0, 1.0)
+    if (logarithmic):
+        low, high = math.log(max(low, 1.0)), math.log(max(high, 2.0))
+    scale = 1.0 / max(high - low, 1e-9)
+
+    hue = np.empty(iterationMap.shape, dtype = np.float32) if (out is None) else out
+    for chunk in getChunks(iterationMap.shape):
+        iterations = iterationMap[chunk]
+        smoothIterations = iterations.astype(np.float64)
+        if (smoothMap is not None):
+            smoothIterations += smoothMap[chunk]
+        if (logarithmic):
+            np.maximum(smoothIterations, 1.0, out = smoothIterations)
+            np.log(smoothIterations, out = smoothIterations)
+        smoothIterations -= low
+        smoothIterations *= scale
+        chunkHue = hue[chunk]
+        chunkHue[...] = smoothIterations
+        chunkHue[iterations >= maxIter] = np.nan
+    return hue
+
+# Splits the screen into tiles of (x, y, w, h)
+def getTiles(width, height, tileSize):
+    tiles = []
+    for y0 in range(0, height, tileSize):
+        for x0 in range(0, width, tileSize):
+            tiles.append((x0, y0, min(tileSize, width - x0), min(tileSize, height - y0), None))
+    return tiles
+
+# Renders the pixels with coordinates multiple of step that aren't known yet
+# The tiles are (x, y, w, h, cache key) in level coordinates and can go outside of the screen,
+# the part outside is only rendered for tiles that are going to be saved on the cache
+# The new tiles are shown as they arrive, using the histogram of the previous level if there is one
+# It returns how many pixels were filled by the subdivision without being iterated, how many
+# pixels and iterations were rendered and the time the workers spent on the tiles
+# When the job is cancelled the tiles that didn't start are dropped and the finished ones are kept
+# The tiles continue the orbits in resume (see reuseLastIterationMap) and add the ones that hit the limit to orbits
+def renderLevel(iterationMap, smoothMap, known, step, tiles, transformationInverse, maxIter, previewHistogram, reference = None, cancelEvent = None, resume = None, orbits = None):
+    levelIterations = iterationMap[::step, ::step]
+    levelSmooth = smoothMap[::step, ::step]
+    levelKnown = known[::step, ::step]
+    levelW, levelH = levelIterations.shape
+
+    # The subdivision works on the whole level at once, the deep zoom isn't subdivided
+    if (subdivisionRendering and reference is None):
+        return renderLevelSubdivided(levelIterations, levelSmooth, levelKnown, 0, 0, step, transformationInverse, maxIter, cancelEvent)
+
+    # The orbits to continue that are on this level, still sorted by x so every tile finds its own
+    if (resume is not None):
+        resumeX, resumeY, resumeLastX, resumeLastY, start = resume
+        onLevel = (resumeX % step == 0) & (resumeY % step == 0)
+        resumeX, resumeY, resumeLastX, resumeLastY = resumeX[onLevel] // step, resumeY[onLevel] // step, resumeLastX[onLevel], resumeLastY[onLevel]
+        unknown = ~levelKnown[resumeX, resumeY]
+        resumeX, resumeY, resumeLastX, resumeLastY = resumeX[unknown], resumeY[unknown], resumeLastX[unknown], resumeLastY[unknown]
+
+    pool = getRenderPool()
+    futures = {}
+    for (x0, y0, w, h, cacheKey) in tiles:
+        vx0, vy0, vx1, vy1 = max(x0, 0), max(y0, 0), min(x0 + w, levelW), min(y0 + h, levelH)
+        visibleKnown = levelKnown[vx0:vx1, vy0:vy1]
+        if (visibleKnown.all()): continue
+
+        tileKnown = None
+        if (visibleKnown.any()):
+            tileKnown = np.zeros((w, h), dtype = bool)
+            tileKnown[vx0 - x0:vx1 - x0, vy0 - y0:vy1 - y0] = visibleKnown
+
+        # The tiles get the orbits to continue as the flat indices of their pixels in the tile
+        tileResume = None
+        if (resume is not None):
+            first, last = np.searchsorted(resumeX, (vx0, vx1))
+            inTile = (resumeY[first:last] >= vy0) & (resumeY[first:last] < vy1)
+            if (inTile.any()):
+                index = (resumeX[first:last][inTile] - x0) * h + (resumeY[first:last][inTile] - y0)
+                tileResume = (index.astype(np.int32), resumeLastX[first:last][inTile], resumeLastY[first:last][inTile], start)
+        future = pool.submit(renderTile, transformationInverse, x0 * step, y0 * step, w, h, maxIter, step, tileKnown, reference, renderEngine,
+            tileResume, orbits is not None)
+        futures[future] = (x0, y0, w, h, cacheKey, tileKnown, tileResume)
+
+    finishedTiles = 0
+    renderedPixels = 0
+    renderedIterations = 0
+    workerSeconds = 0.0
+    for future in getCompletedFutures(futures, cancelEvent):
+        if (cancelEvent is not None and cancelEvent.is_set()):
+            for otherFuture in futures:
+                otherFuture.cancel()
+            break
+        x0, y0, w, h, cacheKey, tileKnown, tileResume = futures[future]
+        vx0, vy0, vx1, vy1 = max(x0, 0), max(y0, 0), min(x0 + w, levelW), min(y0 + h, levelH)
+        tileIterations, tileSmooth, tileSeconds, tileOrbits = future.result()
+        renderedPixels += w * h - (np.count_nonzero(tileKnown) if (tileKnown is not None) else 0)
+        renderedIterations += int(np.minimum(tileIterations, maxIter).sum())
+        # The continued orbits didn't iterate again up to the old limit
+        if (tileResume is not None):
+            renderedIterations -= int(tileResume[3]) * len(tileResume[0])
+        if (tileOrbits is not None and orbits is not None):
+            index, lastX, lastY = tileOrbits
+            orbitX, orbitY = x0 + index // h, y0 + index % h
+            visible = (orbitX >= vx0) & (orbitX < vx1) & (orbitY >= vy0) & (orbitY < vy1)
+            orbits.append(((orbitX[visible] * step).astype(np.int32), (orbitY[visible] * step).astype(np.int32), lastX[visible], lastY[visible]))
+        workerSeconds += tileSeconds
+        visibleIterations = tileIterations[vx0 - x0:vx1 - x0, vy0 - y0:vy1 - y0]
+        visibleSmooth = tileSmooth[vx0 - x0:vx1 - x0, vy0 - y0:vy1 - y0]
+        visibleKnown = levelKnown[vx0:vx1, vy0:vy1]
+        visibleIterations[visibleKnown] = levelIterations[vx0:vx1, vy0:vy1][visibleKnown]
+        visibleSmooth[visibleKnown] = levelSmooth[vx0:vx1, vy0:vy1][visibleKnown]
+
+        levelIterations[vx0:vx1, vy0:vy1] = visibleIterations
+        levelSmooth[vx0:vx1, vy0:vy1] = visibleSmooth
+        visibleKnown[:] = True
+        if (cacheKey is not None):
+            saveCachedTile(cacheKey, tileIterations, tileSmooth, maxIter)
+        blitPreviewTile(vx0 * step, vy0 * step, visibleIterations, visibleSmooth, step, maxIter, previewHistogram)
+
+        finishedTiles += 1
+        progress = (finishedTiles / (len(futures) * 1.0)) * 100.0
+        setStatus("Generating Iteration Map (1/" + str(step) + "): " + "{:.2f}".format(progress) + "%")
+    return (0, renderedPixels, renderedIterations, workerSeconds)
+
+# Mariani-Silver subdivision of a whole level (or band) of pixels that starts at the pixel (x0, y0) of the level
+# The level is split in cells that share their borders, only the borders are iterated and the cells
+# with the same iterations on the whole border are filled without iterating the inside (the smooth
+# offsets are interpolated from the border, see interpolateFromBorder), the others are split in 4
+# The borders of all of the cells of a size are iterated together, split between the workers, so the
+# engines are called a few times for the whole level instead of a few times for every tile
+# The cells of subdivisionMinSize pixels that aren't filled are iterated completely
+# The known pixels are never iterated or filled again but their values count on the borders, and the
+# pixels are marked as known as they are done, so a cancelled level keeps them
+# It returns the same as renderLevel
+def renderLevelSubdivided(levelIterations, levelSmooth, levelKnown, x0, y0, step, transformationInverse, maxIter, cancelEvent = None):
+    levelW, levelH = levelIterations.shape
+    skippedPixels = 0
+    renderedPixels = 0
+    renderedIterations = 0
+    workerSeconds = 0.0
+
+    size = subdivisionStartSize
+    edgesX, cellX, previousX, borderX = getSubdivisionCells(levelW, size)
+    edgesY, cellY, previousY, borderY = getSubdivisionCells(levelH, size)
+    active = np.ones((len(edgesX) - 1, len(edgesY) - 1), dtype = bool)
+    while (True):
+        # The rows and the columns on the borders of the active cells, the corners go with the rows
+        rows = np.flatnonzero(borderY)
+        rowCells = active[:, cellY[rows]] | active[:, previousY[rows]]
+        rowTodo = (rowCells[cellX] | rowCells[previousX]) & ~levelKnown[:, rows]
+        columns = np.flatnonzero(borderX)
+        columnCells = active[cellX[columns]] | active[previousX[columns]]
+        columnTodo = (columnCells[:, cellY] | columnCells[:, previousY]) & ~levelKnown[columns] & ~borderY
+        rowX, rowIndex = np.nonzero(rowTodo)
+        columnIndex, columnY = np.nonzero(columnTodo)
+        px = np.concatenate((rowX, columns[columnIndex]))
+        py = np.concatenate((rows[rowIndex], columnY))
+
+        result = iterateLevelPixels(levelIterations, levelSmooth, levelKnown, px, py, x0, y0, step, transformationInverse, maxIter, cancelEvent)
+        if (result is None):
+            break
+        renderedPixels += len(px)
+        renderedIterations += result[0]
+        workerSeconds += result[1]
+
+        # A cell is filled when its 4 borders have the same iterations, they meet on the corners
+        rowSegments = getUniformSegments(levelIterations[:, edgesY], edgesX)
+        columnSegments = getUniformSegments(levelIterations[edgesX, :].T, edgesY).T
+        uniform = rowSegments[:, :-1] & rowSegments[:, 1:] & columnSegments[:-1, :] & columnSegments[1:, :]
+        fillX, fillY = np.nonzero(active & uniform)
+        if (len(fillX) > 0):
+            inside = np.arange(1, size)
+            shape = (len(fillX), len(inside), len(inside))
+            px = np.broadcast_to(edgesX[fillX][:, np.newaxis, np.newaxis] + inside[np.newaxis, :, np.newaxis], shape)
+            py = np.broadcast_to(edgesY[fillY][:, np.newaxis, np.newaxis] + inside[np.newaxis, np.newaxis, :], shape)
+            cells = np.broadcast_to(np.arange(len(fillX))[:, np.newaxis, np.newaxis], shape)
+            # The cells at the end of the level can be smaller
+            fill = (px < edgesX[fillX + 1][:, np.newaxis, np.newaxis]) & (py < edgesY[fillY + 1][:, np.newaxis, np.newaxis])
+            px, py, cells = px[fill], py[fill], cells[fill]
+            fill = ~levelKnown[px, py]
+            px, py, cells = px[fill], py[fill], cells[fill]
+
+            left, right = edgesX[fillX][cells], edgesX[fillX + 1][cells]
+            top, bottom = edgesY[fillY][cells], edgesY[fillY + 1][cells]
+            levelIterations[px, py] = levelIterations[left, top]
+            levelSmooth[px, py] = interpolateFromBorder(levelSmooth, px, py, left, right, top, bottom)
+            levelKnown[px, py] = True
+            skippedPixels += len(px)
+        setStatus("Generating Iteration Map (1/" + str(step) + "): " + "{:.2f}".format(np.count_nonzero(levelKnown) / (levelW * levelH * 1.0) * 100.0) + "%")
+
+        split = active & ~uniform
+        if (not split.any()):
+            break
+        # The borders of the split cells are known, so only their insides are left
+        if (size <= subdivisionMinSize):
+            px, py = np.nonzero(split[np.ix_(cellX, cellY)] & ~levelKnown)
+            result = iterateLevelPixels(levelIterations, levelSmooth, levelKnown, px, py, x0, y0, step, transformationInverse, maxIter, cancelEvent)
+            if (result is not None):
+                renderedPixels += len(px)
+                renderedIterations += result[0]
+                workerSeconds += result[1]
+            break
+        size //= 2
+        edgesX, cellX, previousX, borderX = getSubdivisionCells(levelW, size)
+        edgesY, cellY, previousY, borderY = getSubdivisionCells(levelH, size)
+        active = np.repeat(np.repeat(split, 2, axis = 0), 2, axis = 1)[:len(edgesX) - 1, :len(edgesY) - 1]
+    return (skippedPixels, renderedPixels, renderedIterations, workerSeconds)
+
+# Iterates the pixels px, py of a level that starts at the pixel (x0, y0), split between the workers, and
+# marks them as known
+# It returns the iterations it did and the time the workers took, or None when the job is cancelled
+def iterateLevelPixels(levelIterations, levelSmooth, levelKnown, px, py, x0, y0, step, transformationInverse, maxIter, cancelEvent = None):
+    pool = getRenderPool()
+    chunks = [chunk for chunk in np.array_split(np.arange(len(px)), getRenderWorkerCount()) if (len(chunk) > 0)]
+    futures = [pool.submit(renderSubsamples, transformationInverse, ((x0 + px[chunk]) * step).astype(np.float64),
+        ((y0 + py[chunk]) * step).astype(np.float64), maxIter, None, renderEngine) for chunk in chunks]
+    for future in getCompletedFutures(futures, cancelEvent):
+        pass
+    if (cancelEvent is not None and cancelEvent.is_set()):
+        return None
+
+    renderedIterations = 0
+    workerSeconds = 0.0
+    for (chunk, future) in zip(chunks, futures):
+        iterations, smooth, seconds = future.result()
+        levelIterations[px[chunk], py[chunk]] = iterations
+        levelSmooth[px[chunk], py[chunk]] = smooth
+        renderedIterations += int(np.minimum(iterations, maxIter).sum())
+        workerSeconds += seconds
+    levelKnown[px, py] = True
+    return (renderedIterations, workerSeconds)
+
+# Cells of size pixels along an axis of n pixels, every cell goes from its first pixel to the first
+# one of the next cell (the last one ends on the last pixel), so the neighbor cells share a border
+# It returns the first pixel of every cell and of the one after it, the cell of each pixel,
+# the cell before it for the pixels on a border and which pixels are on a border
+def getSubdivisionCells(n, size):
+    cells = max(1, (n - 1 + size - 1) // size)
+    edges = np.minimum(np.arange(cells + 1) * size, n - 1)
+    pixels = np.arange(n)
+    cell = np.minimum(pixels // size, cells - 1)
+    border = (pixels % size == 0) | (pixels == n - 1)
+    previous = np.where((pixels % size == 0) & (pixels > 0), np.minimum(pixels // size - 1, cells - 1), cell)
+    return (edges, cell, previous, border)
+
+# Which segments between the edges of the lines (the columns of values) have the same value on all of their pixels
+def getUniformSegments(values, edges):
+    changes = np.zeros(values.shape, dtype = np.int64)
+    np.cumsum(values[1:] != values[:-1], axis = 0, out = changes[1:])
+    return changes[edges[1:]] == changes[edges[:-1]]
+
+# The futures as they are done, until they are all done or the cancel event is set, then the
+# ones that didn't start are cancelled
+def getCompletedFutures(futures, cancelEvent = None):
+    pending = set(futures)
+    while (pending):
+        if (cancelEvent is not None and cancelEvent.is_set()):
+            for future in pending:
+                future.cancel()
+            return
+        done, pending = concurrent.futures.wait(pending, timeout = renderWaitInterval, return_when = concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            yield future
+
+# Runs inside the worker processes, so everything comes by parameter
+# It returns the iterations, the smooth offsets, the time the worker took, used to know how busy
+# the workers are, and with keepOrbits the orbits that hit the limit (see calculateTileOrbits) or None
+# The deep zoom doesn't keep the orbits, so it doesn't continue them either
+def renderTile(transformationInverse, x0, y0, w, h, maxIter, step = 1, known = None, reference = None, engine = 'numpy', resume = None, keepOrbits = False):
+    startTime = time.perf_counter()
+    orbits = None
+    if (keepOrbits and reference is None):
+        tileIterations, tileSmooth, orbits = calculateTileOrbits(transformationInverse, x0, y0, w, h, maxIter, step, known, engine, resume)
+    else:
+        tileIterations, tileSmooth = calculateTile(transformationInverse, x0, y0, w, h, maxIter, step, known, reference, engine)
+    return (tileIterations.astype(getIterationsDtype(maxIter)), tileSmooth, time.perf_counter() - startTime, orbits)
+
+# Like calculateTile, but it also gives the orbits that hit the limit as the flat indices of their
+# pixels in the tile and their last z (NaN when the point is periodic)
+# The pixels in resume (flat indices, last z real, last z imaginary, start) continue from their z after start iterations
+def calculateTileOrbits(transformationInverse, x0, y0, w, h, maxIter, step = 1, known = None, engine = 'numpy', resume = None):
+    real, imaginary = getComplexGrid(transformationInverse, x0, y0, w, h, step)
+    iterations = np.zeros((w, h), dtype = np.int64)
+    smooth = np.zeros((w, h), dtype = np.float32)
+    lastX = np.full((w, h), np.inf)
+    lastY = np.full((w, h), np.inf)
+    todo = ~known if (known is not None) else np.ones((w, h), dtype = bool)
+    if (resume is not None):
+        index, resumeX, resumeY, start = resume
+        keep = todo.reshape(-1)[index]
+        resumed = index[keep]
+        todo.reshape(-1)[resumed] = False
+        iterations.reshape(-1)[resumed], smooth.reshape(-1)[resumed], lastX.reshape(-1)[resumed], lastY.reshape(-1)[resumed] = renderEngines[engine](
+            real.reshape(-1)[resumed], imaginary.reshape(-1)[resumed], maxIter, True, (resumeX[keep], resumeY[keep], start))
+    iterations[todo], smooth[todo], lastX[todo], lastY[todo] = renderEngines[engine](real[todo], imaginary[todo], maxIter, True)
+
+    # The points that escaped right on the limit aren't hits, and the ones inside the cardioid or the bulb
+    # are found again without their orbits
+    hitLimit = np.flatnonzero((iterations >= maxIter) & ~np.isinf(lastX) & ~isInsideCardioidOrBulb(real, imaginary))
+    return (iterations, smooth, (hitLimit.astype(np.int32), lastX.reshape(-1)[hitLimit], lastY.reshape(-1)[hitLimit]))
+
+# Runs inside the worker processes, iterates the points at the (fractional) pixel coordinates xs, ys
+# It returns the iterations, the smooth offsets and the time the worker took
+def renderSubsamples(transformationInverse, xs, ys, maxIter, reference = None, engine = 'numpy'):
+    startTime = time.perf_counter()
+    if (reference is not None):
+        orbitPath, referenceX, referenceY = reference
+        deltaReal = (xs - referenceX) * transformationInverse[0][0] + (ys - referenceY) * transformationInverse[1][0]
+        deltaImaginary = (xs - referenceX) * transformationInverse[0][1] + (ys - referenceY) * transformationInverse[1][1]
+        iterations, smooth = iterateComplexGridPerturbation(deltaReal, deltaImaginary, loadReferenceOrbit(orbitPath), maxIter)
+    else:
+        real = xs * transformationInverse[0][0] + ys * transformationInverse[1][0] + transformationInverse[2][0]
+        imaginary = xs * transformationInverse[0][1] + ys * transformationInverse[1][1] + transformationInverse[2][1]
+        iterations, smooth = renderEngines[engine](real, imaginary, maxIter)
+    return (iterations, smooth, time.perf_counter() - startTime)
+
+# The pixels marked in known are skipped and left as zero
+# With a reference orbit (deep zoom) the tile is rendered with perturbation
+def calculateTile(transformationInverse, x0, y0, w, h, maxIter, step = 1, known = None, reference = None, engine = 'numpy'):
+    if (reference is not None):
+        return calculateIterationMapPerturbation(transformationInverse, x0, y0, w, h, maxIter, step, known, reference)
+    if (known is None):
+        return calculateIterationMap(transformationInverse, x0, y0, w, h, maxIter, step, engine)
+
+    real, imaginary = getComplexGrid(transformationInverse, x0, y0, w, h, step)
+    tileIterations = np.zeros((w, h), dtype = np.int64)
+    tileSmooth = np.zeros((w, h), dtype = np.float32)
+    tileIterations[~known], tileSmooth[~known] = renderEngines[engine](real[~known], imaginary[~known], maxIter)
+    return (tileIterations, tileSmooth)
+
+# Coons patch, the smooth offsets of the pixels px, py inside the cells between the columns left and
+# right and the rows top and bottom are interpolated from the 4 borders of their cells
+def interpolateFromBorder(smooth, px, py, left, right, top, bottom):
+    u = (px - left) / (right - left * 1.0)
+    v = (py - top) / (bottom - top * 1.0)
+    corners = ((1 - u) * (1 - v) * smooth[left, top] + u * (1 - v) * smooth[right, top] +
+        (1 - u) * v * smooth[left, bottom] + u * v * smooth[right, bottom])
+    return (1 - u) * smooth[left, py] + u * smooth[right, py] + (1 - v) * smooth[px, top] + v * smooth[px, bottom] - corners
+
+def isDeepZoom(transformation):
+    return transformation[0][0] > deepZoomThreshold or transformation[1][1] > deepZoomThreshold
+
+# Digits needed to tell the pixels apart at the scale of the transformation
+def getDeepZoomPrecision(transformation):
+    return int(math.log10(max(transformation[0][0], transformation[1][1], 10.0))) + 20
+
+# On deep zoom the complex point at the center of the screen is moved into deepZoomOrigin,
+# so the transformation only keeps a small offset that float64 can represent.
+# When zooming back out the origin goes back into the transformation
+def updateDeepZoomOrigin():
+    global complexSpaceTransformation
+    global deepZoomOrigin
+
+    if (isDeepZoom(complexSpaceTransformation)):
+        with decimal.localcontext() as context:
+            context.prec = getDeepZoomPrecision(complexSpaceTransformation)
+            offsetX = decimal.Decimal(WINDOW_W / 2.0 - complexSpaceTransformation[0][2]) / decimal.Decimal(complexSpaceTransformation[0][0])
+            offsetY = decimal.Decimal(WINDOW_H / 2.0 - complexSpaceTransformation[1][2]) / decimal.Decimal(complexSpaceTransformation[1][1])
+            deepZoomOrigin = (deepZoomOrigin[0] + offsetX, deepZoomOrigin[1] + offsetY)
+        complexSpaceTransformation = complexSpaceTransformation.copy()
+        complexSpaceTransformation[0][2] = WINDOW_W / 2.0
+        complexSpaceTransformation[1][2] = WINDOW_H / 2.0
+    elif (deepZoomOrigin[0] != 0 or deepZoomOrigin[1] != 0):
+        complexSpaceTransformation = complexSpaceTransformation.copy()
+        complexSpaceTransformation[0][2] -= float(deepZoomOrigin[0]) * complexSpaceTransformation[0][0]
+        complexSpaceTransformation[1][2] -= float(deepZoomOrigin[1]) * complexSpaceTransformation[1][1]
+        deepZoomOrigin = (decimal.Decimal(0), decimal.Decimal(0))
+    return
+
+# Orbit Z[n] of the origin calculated with enough decimal digits and stored as float64,
+# it stops at maxIter or when the orbit escapes, and returns None when it's cancelled
+def calculateReferenceOrbit(centerReal, centerImaginary, maxIter, precision, cancelEvent = None):
+    length = min(maxIter, referenceOrbitMaxLength) + 1
+    chunks = [np.zeros((1, 2))]
+    with decimal.localcontext() as context:
+        context.prec = precision
+        x0 = +centerReal
+        y0 = +centerImaginary
+        x = decimal.Decimal(0)
+        y = decimal.Decimal(0)
+        n = 1
+        while (n < length):
+            if (cancelEvent is not None and cancelEvent.is_set()):
+                return None
+            chunk = np.zeros((min(referenceOrbitChunkSize, length - n), 2))
+            chunks.append(chunk)
+            for i in range(len(chunk)):
+                x, y = x * x - y * y + x0, 2 * x * y + y0
+                chunk[i][0] = float(x)
+                chunk[i][1] = float(y)
+                if (chunk[i][0] * chunk[i][0] + chunk[i][1] * chunk[i][1] > 4):
+                    chunks[-1] = chunk[:i + 1]
+                    return np.concatenate(chunks)
+            n += len(chunk)
+    return np.concatenate(chunks)
+
+# The orbit is saved in a temporary file that the workers load only once
+# It returns (orbit file, x, y) where (x, y) is the screen position of the origin, or None when it's cancelled
+def createReferenceOrbit(origin, transformation, maxIter, cancelEvent = None):
+    orbit = calculateReferenceOrbit(origin[0], origin[1], maxIter, getDeepZoomPrecision(transformation), cancelEvent)
+    if (orbit is None):
+        return None
+    orbitFile, orbitPath = tempfile.mkstemp(suffix = '.npy', prefix = 'mandelbrot_orbit_')
+    with os.fdopen(orbitFile, 'wb') as f:
+        np.save(f, orbit)
+    return (orbitPath, transformation[0][2], transformation[1][2])
+
+def removeReferenceOrbit(reference):
+    try:
+        os.remove(reference[0])
+    except OSError:
+        pass
+    return
+
+# The reference orbit of the last render is used again when the origin, the precision and the max
+# iterations are the same, otherwise the new one replaces it. It returns None when it's cancelled
+def getReferenceOrbit(origin, transformation, maxIter, cancelEvent):
+    global lastReferenceOrbit
+
+    key = (origin, getDeepZoomPrecision(transformation), maxIter)
+    if (lastReferenceOrbit is None or lastReferenceOrbit[0] != key):
+        reference = createReferenceOrbit(origin, transformation, maxIter, cancelEvent)
+        if (reference is None):
+            return None
+        removeLastReferenceOrbit()
+        lastReferenceOrbit = (key, reference[0])
+    return (lastReferenceOrbit[1], transformation[0][2], transformation[1][2])
+
+def removeLastReferenceOrbit():
+    global lastReferenceOrbit
+
+    if (lastReferenceOrbit is not None):
+        removeReferenceOrbit(lastReferenceOrbit[1:])
+        lastReferenceOrbit = None
+    return
+
+def loadReferenceOrbit(orbitPath):
+    if (orbitPath not in referenceOrbitCache):
+        if (not referenceOrbitFiles):
+            raise ValueError("The reference orbit " + orbitPath + " wasn't sent")
+        referenceOrbitCache.clear()
+        referenceOrbitCache[orbitPath] = np.load(orbitPath)
+    return referenceOrbitCache[orbitPath]
+
+# Perturbation, each pixel is c = C + dc where C is the origin with the reference orbit Z[m]
+# and only the difference dz = z - Z[m] is iterated in float64:
+#   dz[n + 1] = 2 * Z[m] * dz[n] + dz[n] ^ 2 + dc
+# A glitch happens when |z| gets smaller than |dz| (the difference loses precision), those pixels
+# and the ones that get to the end of the reference orbit are rebased: dz = z and m goes back to 0
+def iterateComplexGridPerturbation(deltaReal, deltaImaginary, orbit, maxIter):
+    iterations = np.zeros(deltaReal.shape, dtype = np.int64)
+    flatIterations = iterations.reshape(-1)
+    smooth = np.zeros(deltaReal.shape, dtype = np.float32)
+    flatSmooth = smooth.reshape(-1)
+    orbitX = np.ascontiguousarray(orbit[:, 0])
+    orbitY = np.ascontiguousarray(orbit[:, 1])
+    lastReference = len(orbit) - 1
+
+    active = np.arange(deltaReal.size)
+    dcx = deltaReal.reshape(-1).copy()
+    dcy = deltaImaginary.reshape(-1).copy()
+    dx = np.zeros(active.size)
+    dy = np.zeros(active.size)
+    m = np.zeros(active.size, dtype = np.int64)
+
+    n = 0
+    while (active.size > 0 and n < maxIter):
+        zx = orbitX[m]
+        zy = orbitY[m]
+        newDx = 2 * (zx * dx - zy * dy) + dx * dx - dy * dy + dcx
+        dy = 2 * (zx * dy + zy * dx) + 2 * dx * dy + dcy
+        dx = newDx
+        m += 1
+        n += 1
+
+        x = orbitX[m] + dx
+        y = orbitY[m] + dy
+        magnitude = x * x + y * y
+        rebase = (magnitude < dx * dx + dy * dy) | (m == lastReference)
+        if (rebase.any()):
+            dx = np.where(rebase, x, dx)
+            dy = np.where(rebase, y, dy)
+            m[rebase] = 0
+
+        inside = (magnitude <= 4)
+        if (not inside.all()):
+            # Past the escape the precision of c doesn't matter, Z[1] is the center in float64
+            flatIterations[active[~inside]] = n
+            flatSmooth[active[~inside]] = getSmoothOffset(x[~inside], y[~inside], orbitX[1] + dcx[~inside], orbitY[1] + dcy[~inside])
+            active = active[inside]
+            dcx = dcx[inside]
+            dcy = dcy[inside]
+            dx = dx[inside]
+            dy = dy[inside]
+            m = m[inside]
+
+    flatIterations[active] = n
+    return (iterations, smooth)
+
+def calculateIterationMapPerturbation(transformationInverse, x0, y0, w, h, maxIter, step, known, reference):
+    orbitPath, referenceX, referenceY = reference
+    orbit = loadReferenceOrbit(orbitPath)
+
+    # dc only depends on the distance to the reference pixel
+    deltaInverse = np.array(transformationInverse, dtype = np.float64)
+    deltaInverse[2][0] = 0.0
+    deltaInverse[2][1] = 0.0
+    deltaReal, deltaImaginary = getComplexGrid(deltaInverse, x0 - referenceX, y0 - referenceY, w, h, step)
+
+    if (known is None):
+        return iterateComplexGridPerturbation(deltaReal, deltaImaginary, orbit, maxIter)
+    tileIterations = np.zeros((w, h), dtype = np.int64)
+    tileSmooth = np.zeros((w, h), dtype = np.float32)
+    tileIterations[~known], tileSmooth[~known] = iterateComplexGridPerturbation(deltaReal[~known], deltaImaginary[~known], orbit, maxIter)
+    return (tileIterations, tileSmooth)
+
+def getRenderPool():
+    global renderPool
+    if (renderPool is None and renderCoordinatorAddress is not None):
+        renderPool = DistributedRenderPool(renderCoordinatorAddress)
+    elif (renderPool is None):
+        threadsPerWorker = max(1, (os.cpu_count() or 1) // renderWorkers)
+        renderPool = concurrent.futures.ProcessPoolExecutor(max_workers = renderWorkers, initializer = initRenderWorker, initargs = (threadsPerWorker,))
+    return renderPool
+
+# The distributed workers come and go, so they are counted when it's needed
+def getRenderWorkerCount():
+    if (isinstance(renderPool, DistributedRenderPool)):
+        return max(1, len(renderPool.workers))
+    return renderWorkers
+
+# The cores are shared between the processes, so the numba engine uses only its part of them
+def initRenderWorker(threadsPerWorker):
+    if (numba is not None):
+        numba.set_num_threads(min(threadsPerWorker, numba.config.NUMBA_NUM_THREADS))
+    return
+
+def shutdownRenderPool():
+    global renderPool
+    if (renderPool is not None):
+        renderPool.shutdown(cancel_futures = True)
+        renderPool = None
+    return
+
+# The functions the distributed workers can run, the messages only name them
+def getDistributedFunctions():
+    return {'renderTile': renderTile, 'renderSubsamples': renderSubsamples, 'renderAnimationSegment': renderAnimationSegment}
+
+# The workers only render and send the results back, so the tasks that would make them save files are refused
+# (the frames of the animations come back to the coordinator, and the pallete comes as its colors)
+def checkDistributedTask(functionName, args):
+    if (functionName == 'renderAnimationSegment' and args[4] is not None):
+        raise ValueError("The distributed workers don't save frames")
+    return
+
+# Sockets for the addresses host:port (TCP) and unix:/path
+def listenSocket(address):
+    if (address.startswith('unix:')):
+        path = address[len('unix:'):]
+        if (os.path.exists(path)):
+            os.remove(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+    else:
+        host, port = address.rsplit(':', 1)
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, int(port)))
+    listener.listen()
+    return listener
+
+def connectSocket(address):
+    if (address.startswith('unix:')):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(address[len('unix:'):])
+    else:
+        host, port = address.rsplit(':', 1)
+        connection = socket.create_connection((host, int(port)))
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return connection
+
+# Messages between the coordinator and the workers: the length of a JSON header, the header and the
+# raw bytes of the arrays, nothing is pickled. The value of the message (arguments or results) goes
+# in the header with the arrays and bytes replaced by {"buffer": i}, the header lists their types and shapes
+def sendMessage(connection, header, value = None):
+    buffers = []
+    header = dict(header)
+    header['value'] = encodeMessageValue(value, buffers)
+    header['buffers'] = [([buffer.dtype.str, list(buffer.shape)] if (isinstance(buffer, np.ndarray)) else ['bytes', len(buffer)]) for buffer in buffers]
+    data = json.dumps(header).encode('utf-8')
+    connection.sendall(struct.pack('>I', len(data)) + data)
+    for buffer in buffers:
+        connection.sendall(buffer)
+    return
+
+def encodeMessageValue(value, buffers):
+    if (isinstance(value, np.ndarray)):
+        buffers.append(np.ascontiguousarray(value))
+        return {'buffer': len(buffers) - 1}
+    if (isinstance(value, bytes)):
+        buffers.append(value)
+        return {'buffer': len(buffers) - 1}
+    if (isinstance(value, (list, tuple))):
+        return [encodeMessageValue(item, buffers) for item in value]
+    if (isinstance(value, np.generic)):
+        return value.item()
+    return value
+
+def receiveMessage(connection):
+    length, = struct.unpack('>I', receiveBytes(connection, 4))
+    header = json.loads(receiveBytes(connection, length).decode('utf-8'))
+    buffers = []
+    for (kind, shape) in header['buffers']:
+        if (kind == 'bytes'):
+            buffers.append(bytes(receiveBytes(connection, shape)))
+            continue
+        dtype = np.dtype(kind)
+        if (dtype.hasobject):
+            raise ValueError("Arrays of objects can't be received")
+        data = receiveBytes(connection, int(np.prod(shape)) * dtype.itemsize)
+        buffers.append(np.frombuffer(data, dtype = dtype).reshape(shape))
+    return (header, decodeMessageValue(header['value'], buffers))
+
+def decodeMessageValue(value, buffers):
+    if (isinstance(value, dict)):
+        return buffers[value['buffer']]
+    if (isinstance(value, list)):
+        return [decodeMessageValue(item, buffers) for item in value]
+    return value
+
+# The arrays are made on a bytearray so they can be written
+def receiveBytes(connection, size):
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while (received < size):
+        count = connection.recv_into(view[received:], size - received)
+        if (count == 0):
+            raise ConnectionError("Connection closed")
+        received += count
+    return data
+
+# The deep zoom tiles name the file of the reference orbit, the workers can be on other machines
+# so they get the orbit before the first tile that uses it
+def getReferenceOrbitPaths(value):
+    if (isinstance(value, str)):
+        return [value] if (os.path.basename(value).startswith('mandelbrot_orbit_')) else []
+    if (isinstance(value, (list, tuple))):
+        return [path for item in value for path in getReferenceOrbitPaths(item)]
+    return []
+
+# Works like the process pool for the render (submit and shutdown), but the tasks go to the
+# workers connected to the address. Every worker renders one task at a time, the results come
+# back as they are done and the tasks of a worker that disconnects or stops sending heartbeats
+# are given to the next free worker
+class DistributedRenderPool:
+    def __init__(self, address):
+        self.address = address
+        self.tasks = collections.deque()
+        self.condition = threading.Condition()
+        self.workers = []
+        self.nextTaskId = 0
+        self.closed = False
+        self.listener = listenSocket(address)
+        threading.Thread(target = self.acceptWorkers, daemon = True).start()
+
+    def submit(self, function, *args):
+        if (function.__name__ not in getDistributedFunctions()):
+            raise ValueError(function.__name__ + " can't run on the distributed workers")
+        future = concurrent.futures.Future()
+        with self.condition:
+            self.tasks.append((self.nextTaskId, function.__name__, args, future))
+            self.nextTaskId += 1
+            self.condition.notify_all()
+        return future
+
+    def acceptWorkers(self):
+        while (not self.closed):
+            try:
+                connection, peer = self.listener.accept()
+            except OSError:
+                return
+            connection.settimeout(workerTimeout)
+            worker = {'connection': connection, 'running': {}, 'orbits': set(), 'alive': True}
+            with self.condition:
+                self.workers.append(worker)
+            threading.Thread(target = self.sendTasks, args = (worker,), daemon = True).start()
+            threading.Thread(target = self.receiveResults, args = (worker,), daemon = True).start()
+
+    # Waits for a task while the worker has none running
+    def takeTask(self, worker):
+        with self.condition:
+            while (True):
+                if (self.closed or not worker['alive']):
+                    return None
+                if (self.tasks and not worker['running']):
+                    task = self.tasks.popleft()
+                    future = task[3]
+                    # A task taken back from a dead worker is already running
+                    if (future.done() or (not future.running() and not future.set_running_or_notify_cancel())):
+                        continue
+                    worker['running'][task[0]] = task
+                    return task
+                self.condition.wait()
+
+    def sendTasks(self, worker):
+        while (True):
+            task = self.takeTask(worker)
+            if (task is None):
+                return
+            taskId, functionName, args, future = task
+            try:
+                for path in getReferenceOrbitPaths(args):
+                    if (path not in worker['orbits']):
+                        sendMessage(worker['connection'], {'type': 'orbit', 'path': path}, loadReferenceOrbit(path))
+                        worker['orbits'].add(path)
+                sendMessage(worker['connection'], {'type': 'task', 'id': taskId, 'function': functionName}, args)
+            except (OSError, ValueError):
+                self.dropWorker(worker)
+                return
+
+    # Any message (a result or a heartbeat) shows that the worker is alive
+    def receiveResults(self, worker):
+        while (True):
+            try:
+                header, value = receiveMessage(worker['connection'])
+            except (OSError, ValueError, KeyError, struct.error):
+                self.dropWorker(worker)
+                return
+            if (header['type'] not in ('result', 'error')):
+                continue
+            with self.condition:
+                task = worker['running'].pop(header['id'], None)
+                self.condition.notify_all()
+            if (task is None or task[3].done()):
+                continue
+            if (header['type'] == 'error'):
+                task[3].set_exception(RuntimeError("Worker error: " + value))
+            elif (task[1] == 'renderAnimationSegment'):
+                task[3].set_result(value)
+            else:
+                task[3].set_result(tuple(value))
+
+    def dropWorker(self, worker):
+        with self.condition:
+            if (not worker['alive']):
+                return
+            worker['alive'] = False
+            # After the shutdown nothing takes the tasks anymore, so they fail instead
+            for task in worker['running'].values():
+                if (not self.closed):
+                    self.tasks.appendleft(task)
+                elif (not task[3].done()):
+                    task[3].set_exception(concurrent.futures.CancelledError())
+            worker['running'].clear()
+            self.workers.remove(worker)
+            self.condition.notify_all()
+        try:
+            worker['connection'].close()
+        except OSError:
+            pass
+        return
+
+    def shutdown(self, wait = True, cancel_futures = False):
+        with self.condition:
+            self.closed = True
+            for task in self.tasks:
+                # Like the process pool, the cancelled futures are notified so the waits see them as done
+                if (task[3].cancel()):
+                    task[3].set_running_or_notify_cancel()
+                elif (not task[3].done()):
+                    task[3].set_exception(concurrent.futures.CancelledError())
+            self.tasks.clear()
+            workers = list(self.workers)
+            self.condition.notify_all()
+        self.listener.close()
+        for worker in workers:
+            self.dropWorker(worker)
+        if (self.address.startswith('unix:') and os.path.exists(self.address[len('unix:'):])):
+            os.remove(self.address[len('unix:'):])
+        return
+
+# Render workers, each one connects to the coordinator and renders the tasks it gets until the
+# connection closes, then it waits for the next coordinator. More than one worker are separate processes
+def runRenderWorkers(address, workers):
+    if (workers == 1):
+        runRenderWorker(address, 1)
+        return
+    processes = [multiprocessing.Process(target = runRenderWorker, args = (address, workers)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return
+
+def runRenderWorker(address, workers):
+    global referenceOrbitFiles
+    initRenderWorker(max(1, (os.cpu_count() or 1) // workers))
+    referenceOrbitFiles = False
+    functions = getDistributedFunctions()
+    while (True):
+        try:
+            connection = connectSocket(address)
+        except OSError:
+            time.sleep(heartbeatInterval)
+            continue
+        print("Connected to " + address)
+
+        sendLock = threading.Lock()
+        stopped = threading.Event()
+        def sendHeartbeats():
+            while (not stopped.wait(heartbeatInterval)):
+                try:
+                    with sendLock:
+                        sendMessage(connection, {'type': 'heartbeat'})
+                except OSError:
+                    return
+        threading.Thread(target = sendHeartbeats, daemon = True).start()
+
+        try:
+            while (True):
+                header, value = receiveMessage(connection)
+                if (header['type'] == 'orbit'):
+                    referenceOrbitCache.clear()
+                    referenceOrbitCache[header['path']] = value
+                    continue
+                try:
+                    checkDistributedTask(header['function'], value)
+                    result = functions[header['function']](*value)
+                    reply = {'type': 'result', 'id': header['id']}
+                except Exception as e:
+                    result = str(e)
+                    reply = {'type': 'error', 'id': header['id']}
+                with sendLock:
+                    sendMessage(connection, reply, result)
+        except (OSError, ValueError, KeyError, struct.error):
+            pass
+        stopped.set()
+        connection.close()
+        print("Disconnected from " + address)
+        time.sleep(heartbeatInterval)
+
+# The cache tiles are aligned to the pixel grid of the complex plane at the current zoom
+# It returns (scale x, scale y, translation x, translation y) or None when the translation
+# isn't on whole pixels and the tiles wouldn't line up
+def getTileCacheView(transformation):
+    if (not tileCacheEnabled):
+        return None
+    tx, ty = transformation[0][2], transformation[1][2]
+    if (tx != round(tx) or ty != round(ty)):
+        return None
+    return (transformation[0][0], transformation[1][1], int(tx), int(ty))
+
+# Screen tiles of the cache grid that cover the screen, the key of each tile
+# is (zoom level, tile x, tile y, maxIterations)
+def getCacheTiles(width, height, tileSize, cacheView, maxIter):
+    scaleX, scaleY, tx, ty = cacheView
+    zoomLevel = scaleX.hex() + '_' + scaleY.hex()
+    tiles = []
+    for tileY in range((-ty) // tileSize, (height - 1 - ty) // tileSize + 1):
+        for tileX in range((-tx) // tileSize, (width - 1 - tx) // tileSize + 1):
+            x0, y0 = tileX * tileSize + tx, tileY * tileSize + ty
+            tiles.append((x0, y0, tileSize, tileSize, (zoomLevel, tileX, tileY, maxIter)))
+    return tiles
+
+def getTileCachePath(cacheKey):
+    zoomLevel, tileX, tileY, maxIter = cacheKey
+    return os.path.join(tileCacheDir, zoomLevel + '_' + str(tileX) + '_' + str(tileY) + '_' + str(maxIter) + '_smooth.npy')
+
+# Index of the cache files from the least to the most recently used
+def getTileCacheIndex():
+    global tileCacheIndex
+    if (tileCacheIndex is None):
+        tileCacheIndex = collections.OrderedDict()
+        if (os.path.isdir(tileCacheDir)):
+            entries = [entry for entry in os.scandir(tileCacheDir) if entry.name.endswith('.npy')]
+            for entry in sorted(entries, key = lambda entry: entry.stat().st_mtime):
+                tileCacheIndex[entry.path] = entry.stat().st_size
+    return tileCacheIndex
+
+# Copies the cached tiles into the iteration and smooth maps, the files are memory mapped
+# so only the visible part of each tile is read
+def loadCachedTiles(iterationMap, smoothMap, known, tiles):
+    global tileCacheHits
+    global tileCacheMisses
+    index = getTileCacheIndex()
+    width, height = iterationMap.shape
+
+    for (x0, y0, w, h, cacheKey) in tiles:
+        vx0, vy0, vx1, vy1 = max(x0, 0), max(y0, 0), min(x0 + w, width), min(y0 + h, height)
+        if (known[vx0:vx1, vy0:vy1].all()): continue
+
+        path = getTileCachePath(cacheKey)
+        if (path not in index):
+            tileCacheMisses += 1
+            continue
+        try:
+            tile = np.load(path, mmap_mode = 'r')
+            tileIterations, tileSmooth = tile['iterations'], tile['smooth']
+        except (OSError, ValueError):
+            del index[path]
+            tileCacheMisses += 1
+            continue
+
+        iterationMap[vx0:vx1, vy0:vy1] = tileIterations[vx0 - x0:vx1 - x0, vy0 - y0:vy1 - y0]
+        smoothMap[vx0:vx1, vy0:vy1] = tileSmooth[vx0 - x0:vx1 - x0, vy0 - y0:vy1 - y0]
+        known[vx0:vx1, vy0:vy1] = True
+        index.move_to_end(path)
+        os.utime(path)
+        tileCacheHits += 1
+    return
+
+# The iterations and the smooth offsets of a tile are saved together in a single file
+def saveCachedTile(cacheKey, tileIterations, tileSmooth, maxIter):
+    index = getTileCacheIndex()
+    path = getTileCachePath(cacheKey)
+    tile = np.zeros(tileIterations.shape, dtype = [('iterations', getIterationsDtype(maxIter)), ('smooth', np.float32)])
+    tile['iterations'] = tileIterations
+    tile['smooth'] = tileSmooth
+    try:
+        os.makedirs(tileCacheDir, exist_ok = True)
+        np.save(path, tile)
+    except OSError:
+        return
+    index[path] = os.path.getsize(path)
+    index.move_to_end(path)
+
+    # Removes the least recently used tiles
+    totalBytes = sum(index.values())
+    while (totalBytes > tileCacheMaxBytes and len(index) > 1):
+        oldPath, size = index.popitem(last = False)
+        totalBytes -= size
+        try:
+            os.remove(oldPath)
+        except OSError:
+            pass
+    return
+
+# Shows a finished tile while the rest of the frame is being rendered
+# Each sample of the tile covers a step x step block of pixels
+# The final colors depend on the histogram of the whole frame, so without
+# a histogram from a previous level it is gray for now
+def blitPreviewTile(x0, y0, tileIterations, tileSmooth, step, maxIter, histogram = None):
+    if (histogram is None):
+        gray = np.log(np.maximum(tileIterations, 1)) / math.log(max(maxIter, 2)) * 255.0
+        gray[tileIterations >= maxIter] = 0
+        gray = gray.astype(np.uint8)
+        colors = np.dstack((gray, gray, gray))
+    else:
+        colors = calculateColors(calculateHue(tileIterations, tileSmooth, histogram, maxIter, colorMapping), palleteColors)
+
+    if (step > 1):
+        colors = np.repeat(np.repeat(colors, step, axis = 0), step, axis = 1)
+        colors = colors[:WINDOW_W - x0, :WINDOW_H - y0]
+    tileSurface = pygame.surfarray.make_surface(colors)
+
+    renderingThreadLock.acquire()
+    offscreenSurface.blit(tileSurface, (x0, y0))
+    renderingSurface.blit(tileSurface, (x0, y0))
+    renderingThreadLock.release()
+    invalidateScreen()
     return
 
 def moveDir(x, y):
     global complexSpaceTransformation
     global moveSpeed
 
+    # It moves by whole pixels so the last iteration map can be reused
+    # On deep zoom the move is in pixels, a distance in the complex plane would be way bigger than the screen
     scaledValue = projectFromComplex(x / 100.0, y / 100.0, 0)
+    if (isDeepZoom(complexSpaceTransformation)):
+        scaledValue = (x * deepZoomMoveStep, y * deepZoomMoveStep)
     transformation = np.array(
-        [[0.0, 0.0, scaledValue[0] * moveSpeed],
-        [0.0, 0.0, scaledValue[1] * moveSpeed],
+        [[0.0, 0.0, roundToPixel(scaledValue[0] * moveSpeed)],
+        [0.0, 0.0, roundToPixel(scaledValue[1] * moveSpeed)],
         [0.0, 0.0, 0.0]])
 
     complexSpaceTransformation = np.add(complexSpaceTransformation, transformation)
 
     calculateTransformationMatrix()
+    restartRender()
     return
 
+def roundToPixel(value):
+    if (value == 0): return 0.0
+    return math.copysign(max(1.0, round(abs(value))), value)
+
 def zoomDir(scalar):
     global complexSpaceTransformation
     global zoomSpeed
@@ -259,77 +1911,617 @@ def zoomDir(scalar):
     complexSpaceTransformation = np.add(complexSpaceTransformation, transformation)
 
     calculateTransformationMatrix()
+    restartRender()
+    return
+
+def toggleProgressiveRendering():
+    global progressiveRendering
+    progressiveRendering = not progressiveRendering
+    setStatus("Progressive Rendering: " + ("On" if progressiveRendering else "Off"))
+    return
+
+def toggleSubdivisionRendering():
+    global subdivisionRendering
+    subdivisionRendering = not subdivisionRendering
+    setStatus("Subdivision Rendering: " + ("On" if subdivisionRendering else "Off"))
+    return
+
+def nextRenderEngine():
+    global renderEngine
+    engines = list(renderEngines.keys())
+    renderEngine = engines[(engines.index(renderEngine) + 1) % len(engines)]
+    setStatus("Render Engine: " + renderEngine)
     return
 
 def iterDir(scalar):
     global maxIterations
+    global adaptiveIterations
+
+    # Choosing the max iterations by hand turns the adaptive ones off
+    adaptiveIterations = False
     if (scalar == 1):
         if (maxIterations > 10.0):
             maxIterations = int(maxIterations / 10)
     if (scalar == -1):
         if (maxIterations < 10000000000.0):
             maxIterations = int(maxIterations * 10)
+    restartRender()
     return
 
-def loadPallete(palleteFilePath):
-    global collorPallete
+def toggleAntialiasing():
+    global antialiasing
+    antialiasing = not antialiasing
+    setStatus("Anti-aliasing: " + ("On" if antialiasing else "Off"))
+    restartRender()
+    return
+
+def toggleAdaptiveIterations():
+    global adaptiveIterations
+    adaptiveIterations = not adaptiveIterations
+    setStatus("Adaptive Max Iterations: " + ("On" if adaptiveIterations else "Off"))
+    if (adaptiveIterations):
+        restartRender()
+    return
+
+def setAdaptiveMaxIterations(maxIter):
+    global maxIterations
+    maxIterations = maxIter
+    return
+
+# Max iterations suggested by the zoom alone, it grows with the digits of the zoom
+def getZoomIterations(transformation):
+    zoom = max(transformation[0][0], transformation[1][1]) / 100.0
+    return int(adaptiveBaseIterations * (1.0 + max(0.0, math.log10(zoom))) ** 1.5)
+
+# Adaptive max iterations of a view, a grid of about adaptiveSampleCount pixels is iterated up to the
+# iterations of the zoom and then the limit is doubled while enough samples still escape after it
+# Only the samples that hit the limit go on, continuing from their last z instead of starting again
+# On deep zoom float64 can't iterate the samples, so only the zoom is used
+def calculateAdaptiveIterations(transformation, width, height):
+    maxIter = min(getZoomIterations(transformation), adaptiveMaxIterations)
+    if (isDeepZoom(transformation)):
+        return maxIter
+
+    step = max(1, int(math.sqrt(width * height / float(adaptiveSampleCount))))
+    real, imaginary = getComplexGrid(getTransformationInverse(transformation), step // 2, step // 2, max(1, width // step), max(1, height // step), step)
+    sampleCount = real.size
+    outside = ~isInsideCardioidOrBulb(real, imaginary)
+    real, imaginary = real[outside], imaginary[outside]
+    x, y = np.zeros(real.size), np.zeros(real.size)
+
+    start = 0
+    while (real.size > 0):
+        iterations, smooth, x, y = continueComplexGrid(real, imaginary, x, y, start, maxIter)
+        hitLimit = iterations >= maxIter
+        escaped = real.size - np.count_nonzero(hitLimit)
+        if ((start > 0 and escaped <= adaptiveEscapeFraction * sampleCount) or maxIter >= adaptiveMaxIterations):
+            break
+        real, imaginary, x, y = real[hitLimit], imaginary[hitLimit], x[hitLimit], y[hitLimit]
+        start, maxIter = maxIter, min(maxIter * 2, adaptiveMaxIterations)
+    return maxIter
+
+def loadPallete(filePath):
     global palleteImage
-    palleteImage = Image.open(palleteFilePath)
-    collorPallete = palleteImage.load()
+    global palleteColors
+    global palleteFilePath
+    palleteImage = Image.open(filePath)
+    palleteFilePath = filePath
+
+    # Lookup table with the RGB colors of the first row of the pallete, linearly interpolated
+    # to palleteLutSize colors so the smooth hues don't fall on the same pallete pixel
+    row = np.asarray(palleteImage.convert('RGB'), dtype = np.float64)[0]
+    positions = np.linspace(0.0, len(row) - 1.0, palleteLutSize)
+    palleteColors = np.stack([np.interp(positions, np.arange(len(row)), row[:, channel]) for channel in range(3)], axis = 1)
+    palleteColors = np.round(palleteColors).astype(np.uint8)
+    return
+
+def nextPallete():
+    palleteFiles = sorted([os.path.join(palleteDir, name) for name in os.listdir(palleteDir) if name.lower().endswith('.bmp')])
+    if (not palleteFiles):
+        return
+    current = os.path.normpath(palleteFilePath)
+    positions = [i for (i, path) in enumerate(palleteFiles) if os.path.normpath(path) == current]
+    loadPallete(palleteFiles[(positions[0] + 1) % len(palleteFiles)] if (positions) else palleteFiles[0])
+    recolor("Pallete: " + os.path.basename(palleteFilePath))
+    return
+
+def nextColorMapping():
+    global colorMapping
+    colorMapping = colorMappings[(colorMappings.index(colorMapping) + 1) % len(colorMappings)]
+    recolor("Color Mapping: " + colorMapping)
+    return
+
+# Colors the last iteration map again with the current pallete and color mapping, without iterating
+# It is only done when the last render finished and the view didn't change since it, otherwise
+# the next render already uses them
+def recolor(statusText):
+    if (isRendering() or lastIterationMap is None or lastHistogram is None or not lastKnown.all() or
+        lastIterationMap.shape != (WINDOW_W, WINDOW_H) or lastMaxIterations != maxIterations or
+        lastDeepZoomOrigin != deepZoomOrigin or not np.array_equal(lastTransformation, complexSpaceTransformation)):
+        setStatus(statusText)
+        return
+
+    startTime = time.perf_counter()
+    hue = calculateHue(lastIterationMap, lastSmoothMap, lastHistogram, lastMaxIterations, colorMapping, getHueBuffer(WINDOW_W, WINDOW_H))
+    renderingThreadLock.acquire()
+    colors = pygame.surfarray.pixels3d(offscreenSurface)
+    calculateColors(hue, palleteColors, colors)
+    if (lastSubsamples is not None):
+        blendSubsamples(colors, lastSubsamples, lastHistogram, lastMaxIterations)
+    del colors
+    renderingSurface.blit(offscreenSurface, (0, 0))
+    renderingThreadLock.release()
+    setStatus(statusText + " - Recolored in " + "{:.0f}".format((time.perf_counter() - startTime) * 1000.0) + "ms")
+    return
+
+# Saves the iteration map of the last finished render to the snapshots folder
+def saveLastSnapshot():
+    if (isRendering() or lastIterationMap is None or not lastKnown.all()):
+        setStatus("The render has to finish before saving a snapshot")
+        return
+    path = os.path.join(snapshotDir, 'snapshot_' + time.strftime('%Y%m%d_%H%M%S') + '.msetz')
+    try:
+        os.makedirs(snapshotDir, exist_ok = True)
+        saveSnapshot(path, lastIterationMap, lastSmoothMap, lastTransformation, lastMaxIterations, lastDeepZoomOrigin)
+    except OSError as error:
+        setStatus("Couldn't save the snapshot: " + str(error))
+        return
+    setStatus("Snapshot saved to " + path)
+    return
+
+# Goes to the view of a snapshot and shows it as if it was the last render, so it can be
+# recolored and the pixels that stay on the screen are reused when moving
+def showSnapshot(header, records):
+    global complexSpaceTransformation
+    global deepZoomOrigin
+    global maxIterations
+
+    complexSpaceTransformation = np.array(header['transformation'], dtype = np.float64)
+    deepZoomOrigin = (decimal.Decimal(header['origin'][0]), decimal.Decimal(header['origin'][1]))
+    maxIterations = header['maxIterations']
+    calculateTransformationMatrix()
+
+    iterationMap = records['iterations'].T.astype(getIterationsDtype(maxIterations))
+    smoothMap = records['smooth'].T.astype(np.float32)
+    known = np.ones(iterationMap.shape, dtype = bool)
+    setLastIterationMap(iterationMap, smoothMap, known, complexSpaceTransformation.copy(), maxIterations, deepZoomOrigin)
+    setLastHistogram(calculateHistogram(iterationMap))
+    recolor("Snapshot: " + os.path.basename(snapshotPath))
+    return
+
+# Pixels whose color is too different from a neighbor, as a (W, H) mask of the (W, H, 3) colors
+def getEdgePixels(colors):
+    levels = colors.astype(np.int16)
+    edge = np.zeros(colors.shape[:2], dtype = bool)
+    across = np.abs(levels[1:, :] - levels[:-1, :]).max(axis = 2) > antialiasingThreshold
+    edge[1:, :] |= across
+    edge[:-1, :] |= across
+    down = np.abs(levels[:, 1:] - levels[:, :-1]).max(axis = 2) > antialiasingThreshold
+    edge[:, 1:] |= down
+    edge[:, :-1] |= down
+    return edge
+
+# Iterates the extra samples of the edge pixels of a (W, H, 3) block of colors that starts at the pixel (x0, y0)
+# Each pixel is split in a grid of cells and every cell but the center one (the pixel itself) gets a sample
+# on a random point inside it, so the edges don't make regular patterns
+# It returns the x and y of the edge pixels (in the block) and the (pixels * samples) iterations and smooth
+# offsets, or None when the job is cancelled
+def calculateSubsamples(colors, x0, y0, transformationInverse, maxIter, reference = None, cancelEvent = None):
+    px, py = np.nonzero(getEdgePixels(colors))
+    cells = (np.arange(antialiasingGrid) - (antialiasingGrid - 1) / 2.0) / antialiasingGrid
+    cellX, cellY = np.meshgrid(cells, cells, indexing = 'ij')
+    around = (cellX != 0) | (cellY != 0)
+    cellX, cellY = cellX[around], cellY[around]
+
+    jitter = np.random.default_rng(0).uniform(-0.5, 0.5, (len(px), len(cellX), 2)) / antialiasingGrid
+    xs = (x0 + px[:, np.newaxis] + cellX[np.newaxis, :] + jitter[:, :, 0]).reshape(-1)
+    ys = (y0 + py[:, np.newaxis] + cellY[np.newaxis, :] + jitter[:, :, 1]).reshape(-1)
+
+    pool = getRenderPool()
+    futures = [pool.submit(renderSubsamples, transformationInverse, xs[i:i + antialiasingChunkSize], ys[i:i + antialiasingChunkSize], maxIter, reference, renderEngine)
+               for i in range(0, len(xs), antialiasingChunkSize)]
+    for future in getCompletedFutures(futures, cancelEvent):
+        pass
+    if (cancelEvent is not None and cancelEvent.is_set()):
+        return None
+    results = [future.result() for future in futures]
+
+    iterations = np.concatenate([result[0] for result in results]) if (results) else np.zeros(0, dtype = np.int64)
+    smooth = np.concatenate([result[1] for result in results]) if (results) else np.zeros(0, dtype = np.float32)
+    return (px, py, iterations, smooth)
+
+# Averages the colors of the subsamples into the edge pixels of the colors
+def blendSubsamples(colors, subsamples, histogram, maxIter):
+    px, py, iterations, smooth = subsamples
+    if (len(px) == 0):
+        return
+    sampleColors = calculateColors(calculateHue(iterations, smooth, histogram, maxIter, colorMapping), palleteColors).reshape(len(px), -1, 3)
+    total = colors[px, py].astype(np.float32) + sampleColors.sum(axis = 1, dtype = np.float32)
+    colors[px, py] = np.round(total / (sampleColors.shape[1] + 1)).astype(np.uint8)
     return
 
 def getPalleteColor(scalar):
-    width, height = palleteImage.size
-    x = scalar * (width * 1.0)
+    width = len(palleteColors)
+    x = int(scalar * (width * 1.0))
     if (x >= width): x = width - 1
-    return collorPallete[x, 0]
+    return palleteColors[x]
+
+# Colors of the whole hue array as a (W, H, 3) buffer, ready to be blitted
+# Pixels with NaN hue (inside the set) are black
+# With out (like the pixels3d of a surface) the colors are written into it instead of a new buffer
+def calculateColors(hue, palleteColors, out = None):
+    # The NaN hues go to an extra black entry after the pallete, so it's a single gather
+    width = len(palleteColors)
+    colorTable = np.concatenate((palleteColors, np.zeros((1, 3), dtype = palleteColors.dtype)))
+    if (out is None):
+        out = np.empty(hue.shape + (3,), dtype = np.uint8)
+    for chunk in getChunks(hue.shape):
+        index = hue[chunk] * np.float32(width)
+        np.clip(index, 0, width - 1, out = index)
+        np.nan_to_num(index, copy = False, nan = width)
+        np.take(colorTable, index.astype(np.intp), axis = 0, out = out[chunk], mode = 'clip')
+    return out
 
 def drawComplexPlane():
-    pygame.draw.line(screen, (255, 255, 255), projectFromComplex(screenBoundaries[0], 0), projectFromComplex(screenBoundaries[2], 0))
-    pygame.draw.line(screen, (255, 255, 255), projectFromComplex(0, screenBoundaries[1]), projectFromComplex(0, screenBoundaries[3]))
-
-    i = 0
-    while i < screenBoundaries[2]:
-        p = projectFromComplex(i, 0)
-        pygame.draw.line(screen, (255, 255, 255), (p[0], p[1] - 5), (p[0], p[1] + 5))
-        i += 1
-
-    i = 0
-    while i > screenBoundaries[0]:
-        p = projectFromComplex(i, 0)
-        pygame.draw.line(screen, (255, 255, 255), (p[0], p[1] - 5), (p[0], p[1] + 5))
-        i -= 1
-
-    i = 0
-    while i < screenBoundaries[3]:
-        p = projectFromComplex(0, i)
-        pygame.draw.line(screen, (255, 255, 255), (p[0] - 5, p[1]), (p[0] + 5, p[1]))
-        i += 1
-
-    i = 0
-    while i > screenBoundaries[1]:
-        p = projectFromComplex(0, i)
-        pygame.draw.line(screen, (255, 255, 255), (p[0] - 5, p[1]), (p[0] + 5, p[1]))
-        i -= 1
-    
+    for (start, end) in getComplexPlaneLines():
+        pygame.draw.line(screen, (255, 255, 255), start, end)
     return
 
+# The axis and a tick on each integer that is on the screen, kept until the view or the window
+# changes. When the integers are closer than complexPlaneTickSpacing pixels there are no ticks
+def getComplexPlaneLines():
+    global complexPlaneLines
+    global complexPlaneKey
+
+    key = (complexSpaceTransformation.tobytes(), WINDOW_W, WINDOW_H)
+    if (key == complexPlaneKey):
+        return complexPlaneLines
+
+    left, top, right, bottom = getScreenBoundariesInComplexSpace()
+    lines = [(projectFromComplex(left, 0), projectFromComplex(right, 0)), (projectFromComplex(0, top), projectFromComplex(0, bottom))]
+    if (abs(complexSpaceTransformation[0][0]) >= complexPlaneTickSpacing):
+        for i in range(int(math.ceil(min(left, right))), int(math.floor(max(left, right))) + 1):
+            p = projectFromComplex(i, 0)
+            lines.append(((p[0], p[1] - 5), (p[0], p[1] + 5)))
+    if (abs(complexSpaceTransformation[1][1]) >= complexPlaneTickSpacing):
+        for i in range(int(math.ceil(min(top, bottom))), int(math.floor(max(top, bottom))) + 1):
+            p = projectFromComplex(0, i)
+            lines.append(((p[0] - 5, p[1]), (p[0] + 5, p[1])))
+
+    complexPlaneLines = lines
+    complexPlaneKey = key
+    return lines
+
 # Maldelbrot formula
 # Z[n] = Z[n-1] ^ 2 + C
 # Optimized escape time algorithm
 def iterateComplex(x0, y0):
-    x2 = 0
-    y2 = 0
-    x = 0
-    y = 0
-    iterations = 0
-    while (x2 + y2 <= 4 and iterations < maxIterations):
+    return escapeTime(x0, y0, maxIterations)[0]
+
+# Points inside the main cardioid or the period 2 bulb never escape, so they are
+# skipped, and the orbit is compared with a saved point (Brent's periodicity checking,
+# the point is saved at every power of 2 iterations) to stop when it repeats exactly
+# It returns the iterations, the smooth offset (see smoothExtraIterations) and the last z when
+# it hit the limit, NaN when it never escapes and inf when it escaped
+# The orbit can continue from z = startX + startY i after start iterations
+# It is also compiled as it is by the numba engine, so it only uses plain math
+def escapeTime(x0, y0, maxIter, startX = 0.0, startY = 0.0, start = 0):
+    q = (x0 - 0.25) * (x0 - 0.25) + y0 * y0
+    if (q * (q + (x0 - 0.25)) < 0.25 * y0 * y0 or (x0 + 1.0) * (x0 + 1.0) + y0 * y0 < 0.0625):
+        return (maxIter, 0.0, math.nan, math.nan)
+
+    x = startX
+    y = startY
+    x2 = x * x
+    y2 = y * y
+    savedX = x
+    savedY = y
+    checkpoint = max(1, 2 * start)
+    iterations = start
+    while (x2 + y2 <= 4 and iterations < maxIter):
         y = 2 * x * y + y0
         x = x2 - y2 + x0
         x2 = x * x
         y2 = y * y
         iterations += 1
-    return iterations
+
+        if (x == savedX and y == savedY):
+            return (maxIter, 0.0, math.nan, math.nan)
+        if (iterations == checkpoint):
+            savedX = x
+            savedY = y
+            checkpoint *= 2
+    if (x2 + y2 <= 4):
+        return (iterations, 0.0, x, y)
+
+    for i in range(smoothExtraIterations):
+        y = 2 * x * y + y0
+        x = x2 - y2 + x0
+        x2 = x * x
+        y2 = y * y
+    return (iterations, smoothExtraIterations + 1 - np.log2(np.log2(x2 + y2) * 0.5), math.inf, math.inf)
+
+# Works for single points and for arrays of points
+def isInsideCardioidOrBulb(x0, y0):
+    q = (x0 - 0.25) * (x0 - 0.25) + y0 * y0
+    cardioid = q * (q + (x0 - 0.25)) < 0.25 * y0 * y0
+    bulb = (x0 + 1.0) * (x0 + 1.0) + y0 * y0 < 0.0625
+    return cardioid | bulb
+
+# Complex coordinates for a block of screen pixels, indexed as [x][y]
+# It does the same projection as projectToComplex but for the whole block at once
+# With a step bigger than 1 it takes only one pixel every step pixels
+def getComplexGrid(transformationInverse, x0, y0, w, h, step = 1):
+    xs = (x0 + np.arange(w, dtype = np.float64) * step)[:, np.newaxis]
+    ys = (y0 + np.arange(h, dtype = np.float64) * step)[np.newaxis, :]
+    real = xs * transformationInverse[0][0] + ys * transformationInverse[1][0] + transformationInverse[2][0]
+    imaginary = xs * transformationInverse[0][1] + ys * transformationInverse[1][1] + transformationInverse[2][1]
+    return (real, imaginary)
+
+# Same escape time algorithm of iterateComplex but for arrays of points
+# Every step iterates only the points that haven't escaped yet, the escaped
+# ones are removed from the work set so the cost follows the active points
+# With orbit it also returns the last z like escapeTime, and with start (x, y, iterations) the
+# orbits continue from those z
+def iterateComplexGrid(real, imaginary, maxIter, orbit = False, start = None):
+    iterations = np.zeros(real.shape, dtype = np.int64)
+    flatIterations = iterations.reshape(-1)
+    smooth = np.zeros(real.shape, dtype = np.float32)
+    flatSmooth = smooth.reshape(-1)
+    if (orbit):
+        lastX = np.full(real.shape, np.inf)
+        lastY = np.full(real.shape, np.inf)
+        flatLastX = lastX.reshape(-1)
+        flatLastY = lastY.reshape(-1)
+
+    x0 = real.reshape(-1)
+    y0 = imaginary.reshape(-1)
+    interior = isInsideCardioidOrBulb(x0, y0)
+    flatIterations[interior] = maxIter
+    if (orbit):
+        flatLastX[interior] = flatLastY[interior] = np.nan
+
+    active = np.flatnonzero(~interior)
+    x0 = x0[active]
+    y0 = y0[active]
+    n = 0
+    if (start is None):
+        x = np.zeros(active.size)
+        y = np.zeros(active.size)
+    else:
+        x = np.asarray(start[0], dtype = np.float64).reshape(-1)[active]
+        y = np.asarray(start[1], dtype = np.float64).reshape(-1)[active]
+        n = start[2]
+    x2 = x * x
+    y2 = y * y
+    savedX = x.copy()
+    savedY = y.copy()
+    checkpoint = max(1, 2 * n)
+
+    while (active.size > 0 and n < maxIter):
+        y = 2 * x * y + y0
+        x = x2 - y2 + x0
+        x2 = x * x
+        y2 = y * y
+        n += 1
+
+        inside = (x2 + y2 <= 4)
+        periodic = (x == savedX) & (y == savedY)
+        keep = inside & ~periodic
+        if (not keep.all()):
+            flatIterations[active[~inside]] = n
+            flatIterations[active[periodic]] = maxIter
+            if (orbit):
+                flatLastX[active[periodic]] = flatLastY[active[periodic]] = np.nan
+            flatSmooth[active[~inside]] = getSmoothOffset(x[~inside], y[~inside], x0[~inside], y0[~inside])
+            active = active[keep]
+            x0 = x0[keep]
+            y0 = y0[keep]
+            x = x[keep]
+            y = y[keep]
+            x2 = x2[keep]
+            y2 = y2[keep]
+            savedX = savedX[keep]
+            savedY = savedY[keep]
+
+        if (n == checkpoint):
+            savedX = x.copy()
+            savedY = y.copy()
+            checkpoint *= 2
+
+    flatIterations[active] = n
+    if (orbit):
+        flatLastX[active] = x
+        flatLastY[active] = y
+        return (iterations, smooth, lastX, lastY)
+    return (iterations, smooth)
+
+# The smooth iteration count n + 1 - log2(log2|z|) of a point that escaped on the iteration n is
+# continuous, so it doesn't make bands, but it only works well when |z| is big: the escape radius is 2
+# so the orbit goes on for smoothExtraIterations more iterations and they are discounted
+# It returns the offset from n, it is between about -0.4 and 1
+def getSmoothOffset(x, y, x0, y0):
+    for i in range(smoothExtraIterations):
+        x, y = x * x - y * y + x0, 2 * x * y + y0
+    return smoothExtraIterations + 1 - np.log2(np.log2(x * x + y * y) * 0.5)
+
+# Continues the orbits of 1-D arrays of points from z = x + yi, after start iterations, up to maxIter
+# It returns the iterations and the smooth offsets like the engines and the last z of the points,
+# so the ones that hit the limit can be continued again with a higher one
+def continueComplexGrid(real, imaginary, x, y, start, maxIter):
+    iterations = np.full(real.shape, maxIter, dtype = np.int64)
+    smooth = np.zeros(real.shape, dtype = np.float32)
+    lastX, lastY = x.copy(), y.copy()
+
+    active = np.arange(real.size)
+    x0, y0 = real, imaginary
+    n = start
+    while (active.size > 0 and n < maxIter):
+        x, y = x * x - y * y + x0, 2 * x * y + y0
+        n += 1
+
+        escaped = x * x + y * y > 4
+        if (escaped.any()):
+            iterations[active[escaped]] = n
+            smooth[active[escaped]] = getSmoothOffset(x[escaped], y[escaped], x0[escaped], y0[escaped])
+            keep = ~escaped
+            active, x0, y0, x, y = active[keep], x0[keep], y0[keep], x[keep], y[keep]
+
+    lastX[active] = x
+    lastY[active] = y
+    return (iterations, smooth, lastX, lastY)
+
+# Reference engine, escapeTime for each point in plain python
+# It is really slow but it is what the other engines are checked against
+def iterateComplexGridPython(real, imaginary, maxIter, orbit = False, start = None):
+    iterations = np.zeros(real.shape, dtype = np.int64)
+    smooth = np.zeros(real.shape, dtype = np.float32)
+    lastX = np.zeros(real.shape)
+    lastY = np.zeros(real.shape)
+    startX, startY, startIterations = start if (start is not None) else (np.zeros(real.shape), np.zeros(real.shape), 0)
+    for index in np.ndindex(real.shape):
+        iterations[index], smooth[index], lastX[index], lastY[index] = escapeTime(float(real[index]), float(imaginary[index]), maxIter,
+            float(startX[index]), float(startY[index]), startIterations)
+    return (iterations, smooth, lastX, lastY) if (orbit) else (iterations, smooth)
+
+if (numba is not None):
+    escapeTimeCompiled = numba.njit(cache = True)(escapeTime)
+
+    @numba.njit(parallel = True, cache = True)
+    def iterateComplexGridNumbaKernel(real, imaginary, maxIter, startX, startY, start, iterations, smooth, lastX, lastY):
+        for i in numba.prange(real.size):
+            iterations[i], smooth[i], lastX[i], lastY[i] = escapeTimeCompiled(real[i], imaginary[i], maxIter, startX[i], startY[i], start)
+
+# escapeTime compiled by numba, the points are split between the threads
+def iterateComplexGridNumba(real, imaginary, maxIter, orbit = False, start = None):
+    iterations = np.zeros(np.shape(real), dtype = np.int64)
+    smooth = np.zeros(np.shape(real), dtype = np.float32)
+    lastX = np.zeros(np.shape(real))
+    lastY = np.zeros(np.shape(real))
+    startX, startY, startIterations = start if (start is not None) else (lastX, lastY, 0)
+    iterateComplexGridNumbaKernel(np.ascontiguousarray(real, dtype = np.float64).reshape(-1),
+        np.ascontiguousarray(imaginary, dtype = np.float64).reshape(-1), maxIter,
+        np.ascontiguousarray(startX, dtype = np.float64).reshape(-1), np.ascontiguousarray(startY, dtype = np.float64).reshape(-1), startIterations,
+        iterations.reshape(-1), smooth.reshape(-1), lastX.reshape(-1), lastY.reshape(-1))
+    return (iterations, smooth, lastX, lastY) if (orbit) else (iterations, smooth)
+
+# All of the engines take arrays of points and give the same iterations and smooth offsets
+# (and with orbit the last z of the points, see escapeTime), and can continue the orbits from start
+renderEngines = collections.OrderedDict([('python', iterateComplexGridPython), ('numpy', iterateComplexGrid)])
+if (numba is not None):
+    renderEngines['numba'] = iterateComplexGridNumba
+
+# Views used to check and measure the engines as (name, center real, center imaginary, zoom)
+# The zoom is for a 800 pixels wide image
+canonicalViews = [
+    ('full set', -0.5, 0.0, 2.0),
+    ('seahorse valley', -0.7453, 0.1127, 300.0),
+    ('minibrot', -1.9771795870062574, 0.0, 80000.0)]
+
+# Views past deepZoomThreshold, rendered with perturbation, as (name, center real, center imaginary, zoom)
+# The center is given as decimals and the zoom is for a 800 pixels wide image
+deepBenchmarkViews = [
+    ('deep zoom', decimal.Decimal('-1.74995768370609350360221450607069970727110579726252077930242837820286008082972804887218672784431700831100544507655659531379747541999999995'),
+        decimal.Decimal('0.00000000000000000278793706563379402178294753790944364927085054500163081379043930169482384200323963590470624135064483722323413018079620'), 1e20)]
+
+# Renders the canonical views with every engine and compares them with the python engine
+# The size of the image is scaled from 800 pixels wide to keep the same view
+def crossCheckEngines(width = 96, height = 72, maxIter = 1000):
+    identical = True
+    for (name, centerReal, centerImaginary, zoom) in canonicalViews:
+        transformation = getViewTransformation(centerReal, centerImaginary, zoom * width / 800.0, width, height)
+        transformationInverse = getTransformationInverse(transformation)
+        referenceIterations, referenceSmooth = calculateIterationMap(transformationInverse, 0, 0, width, height, maxIter, 1, 'python')
+        for engine in renderEngines:
+            iterations, smooth = calculateIterationMap(transformationInverse, 0, 0, width, height, maxIter, 1, engine)
+            different = np.count_nonzero((iterations != referenceIterations) | (np.abs(smooth - referenceSmooth) > 1e-5))
+            print(name + ' - ' + engine + ': ' + ('identical' if different == 0 else str(different) + ' different pixels'))
+            identical = identical and different == 0
+    return identical
+
+# Max iterations used on each canonical view by the benchmark
+benchmarkIterations = [100, 1000, 10000]
+
+# Times the stages of the render of the canonical views with every engine and saves them to a JSON file
+# The iteration map is rendered by the pool in tiles like on the screen (without the cache and
+# the progressive levels), each stage keeps the best time of the repeats
+# The deep views are rendered with perturbation, which is the same for every engine, so they are
+# rendered once and their reference orbit is timed as its own stage
+def benchmarkEngines(outputPath, width = 400, height = 300, repeats = 3, palleteFilePath = './palletes/pallete3.bmp'):
+    global renderEngine
+    loadPallete(palleteFilePath)
+    results = []
+    for engine in renderEngines:
+        renderEngine = engine
+
+        # Starts the workers and compiles the numba engine before measuring
+        warmUpInverse = getTransformationInverse(getViewTransformation(-0.5, 0.0, 2.0 * width / 800.0, width, height))
+        for band in renderBands(warmUpInverse, width, height, renderTileSize, 100): pass
+
+        for (name, centerReal, centerImaginary, zoom) in canonicalViews:
+            transformation = getViewTransformation(centerReal, centerImaginary, zoom * width / 800.0, width, height)
+            for maxIter in benchmarkIterations:
+                results.append(benchmarkView(name, engine, transformation, None, width, height, maxIter, repeats))
+
+    for (name, centerReal, centerImaginary, zoom) in deepBenchmarkViews:
+        transformation = getViewTransformation(0.0, 0.0, zoom * width / 800.0, width, height)
+        for maxIter in benchmarkIterations:
+            results.append(benchmarkView(name, 'perturbation', transformation, (centerReal, centerImaginary), width, height, maxIter, repeats))
+    shutdownRenderPool()
+
+    benchmark = {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'platform': platform.platform(), 'python': platform.python_version(),
+        'numpy': np.__version__, 'numba': numba.__version__ if (numba is not None) else None,
+        'cpus': os.cpu_count(), 'workers': renderWorkers, 'tileSize': renderTileSize,
+        'width': width, 'height': height, 'repeats': repeats, 'results': results}
+    with open(outputPath, 'w') as benchmarkFile:
+        json.dump(benchmark, benchmarkFile, indent = 2)
+    print("Saved " + outputPath)
+    return
+
+# Times the stages of one view, with an origin the view is relative to it and gets a reference orbit
+def benchmarkView(name, engine, transformation, origin, width, height, maxIter, repeats):
+    transformationInverse = getTransformationInverse(transformation)
+    times = {'iterationMap': [], 'hue': [], 'rasterize': []}
+    if (origin is not None):
+        times = {'referenceOrbit': [], 'iterationMap': [], 'hue': [], 'rasterize': []}
+    for repeat in range(repeats):
+        reference = None
+        if (origin is not None):
+            startTime = time.perf_counter()
+            reference = createReferenceOrbit(origin, transformation, maxIter)
+            times['referenceOrbit'].append(time.perf_counter() - startTime)
+
+        startTime = time.perf_counter()
+        bands = list(renderBands(transformationInverse, width, height, renderTileSize, maxIter, reference))
+        iterationMap = np.concatenate([bandIterations for (y0, bandIterations, bandSmooth, skippedPixels) in bands], axis = 1)
+        smoothMap = np.concatenate([bandSmooth for (y0, bandIterations, bandSmooth, skippedPixels) in bands], axis = 1)
+        times['iterationMap'].append(time.perf_counter() - startTime)
+        if (reference is not None):
+            removeReferenceOrbit(reference)
+
+        startTime = time.perf_counter()
+        hue = calculateHue(iterationMap, smoothMap, calculateHistogram(iterationMap), maxIter)
+        times['hue'].append(time.perf_counter() - startTime)
+
+        startTime = time.perf_counter()
+        colors = calculateColors(hue, palleteColors)
+        times['rasterize'].append(time.perf_counter() - startTime)
+
+    stages = dict([(stage, min(stageTimes)) for (stage, stageTimes) in times.items()])
+    total = sum(stages.values())
+    megapixels = width * height / 1e6
+    print(name + ' - ' + engine + ' - ' + str(maxIter) + ' iterations: ' + ', '.join([stage + ' ' + "{:.3f}".format(seconds) + 's' for (stage, seconds) in stages.items()]))
+    return {
+        'view': name, 'engine': engine, 'maxIterations': maxIter, 'seconds': stages, 'totalSeconds': total,
+        'megapixelsPerSecond': megapixels / total,
+        'iterationMapSecondsPerMegapixel': stages['iterationMap'] / megapixels,
+        'iterationsPerSecond': float(np.minimum(iterationMap, maxIter).sum()) / stages['iterationMap']}
+
+# Iteration map for the block of pixels starting at (x0, y0)
+def calculateIterationMap(transformationInverse, x0, y0, w, h, maxIter, step = 1, engine = 'numpy'):
+    real, imaginary = getComplexGrid(transformationInverse, x0, y0, w, h, step)
+    return renderEngines[engine](real, imaginary, maxIter)
 
 def iterNormalize(iterations):
     res = iterations / 100.0
@@ -345,9 +2537,9 @@ def calculateTransformationMatrix():
     global complexSpaceTransformationTransposed
     global complexSpaceTransformationTransposedInverse
 
+    updateDeepZoomOrigin()
     complexSpaceTransformationTransposed = np.transpose(complexSpaceTransformation)
     complexSpaceTransformationTransposedInverse = np.linalg.inv(complexSpaceTransformationTransposed)
-    print(complexSpaceTransformationTransposedInverse)
     return
 
 # It returns the x, y, w, h
@@ -367,9 +2559,446 @@ def projectToComplex(x, y, w = 1):
     complexSpacePoint = np.dot(screenPoint, complexSpaceTransformationTransposedInverse)
     return (complexSpacePoint[0][0], complexSpacePoint[0][1])
 
+# Transformation of a view centered on a complex point, the zoom is the same shown on the screen
+def getViewTransformation(centerReal, centerImaginary, zoom, width, height):
+    scale = zoom * 100.0
+    return np.array(
+        [[scale, 0.0, width / 2.0 - centerReal * scale],
+         [0.0, scale, height / 2.0 - centerImaginary * scale],
+         [0.0, 0.0, 1.0]])
+
+def getTransformationInverse(transformation):
+    return np.linalg.inv(np.transpose(transformation))
+
+# Merges two histograms of (iteration values, amount of pixels)
+def mergeHistograms(histogram, otherHistogram):
+    values = np.concatenate((histogram[0], otherHistogram[0]))
+    counts = np.concatenate((histogram[1], otherHistogram[1]))
+    mergedValues, inverse = np.unique(values, return_inverse = True)
+    return (mergedValues, np.bincount(inverse, weights = counts).astype(np.int64))
+
+# Iteration and smooth maps of the bands of rows of the image, in order, and how many pixels
+# the subdivision filled without iterating
+# A few bands are kept in flight so the workers don't wait for the bands to be consumed, with the
+# subdivision a few bands are subdivided together (see subdivisionBlockPixels) and the passes are
+# split between the workers
+def renderBands(transformationInverse, width, height, bandHeight, maxIter, reference = None, cancelEvent = None):
+    pool = getRenderPool()
+    pending = collections.deque()
+    bands = range(0, height, bandHeight)
+    if (subdivisionRendering and reference is None):
+        blockHeight = bandHeight * max(1, subdivisionBlockPixels // (width * bandHeight))
+        for blockY in range(0, height, blockHeight):
+            h = min(blockHeight, height - blockY)
+            blockIterations = np.zeros((width, h), dtype = getIterationsDtype(maxIter))
+            blockSmooth = np.zeros((width, h), dtype = np.float32)
+            skippedPixels = renderLevelSubdivided(blockIterations, blockSmooth, np.zeros((width, h), dtype = bool), 0, blockY, 1, transformationInverse, maxIter, cancelEvent)[0]
+            if (cancelEvent is not None and cancelEvent.is_set()):
+                return
+            for y0 in range(0, h, bandHeight):
+                yield (blockY + y0, blockIterations[:, y0:y0 + bandHeight], blockSmooth[:, y0:y0 + bandHeight], skippedPixels if (y0 == 0) else 0)
+        return
+
+    nextBand = 0
+    while (nextBand < len(bands) or pending):
+        while (nextBand < len(bands) and len(pending) < 2 + renderWorkers // 4):
+            y0 = bands[nextBand]
+            h = min(bandHeight, height - y0)
+            futures = [pool.submit(renderTile, transformationInverse, x0, y0, min(bandHeight, width - x0), h, maxIter, 1, None, reference, renderEngine)
+                       for x0 in range(0, width, bandHeight)]
+            pending.append((y0, futures))
+            nextBand += 1
+
+        y0, futures = pending.popleft()
+        for future in getCompletedFutures(futures, cancelEvent):
+            pass
+        if (cancelEvent is not None and cancelEvent.is_set()):
+            for (y0, futures) in pending:
+                for future in futures:
+                    future.cancel()
+            return
+        results = [future.result() for future in futures]
+        yield (y0, np.concatenate([result[0] for result in results], axis = 0), np.concatenate([result[1] for result in results], axis = 0), 0)
+
+# Renders a still image without opening a window
+# The iteration map goes to a temporary file so the memory doesn't depend on the image size,
+# and after the histogram is known the rows are colored and written band by band
+# The center is given as decimals so deep zoom images keep all of its digits
+# With antialias the edges are found inside each band, so the ones right between two bands only
+# get the subsamples when a band also sees them
+def batchRender(outputPath, centerReal, centerImaginary, zoom, maxIter, palleteFilePath, width, height, snapshotPath = None, antialias = False):
+    loadPallete(palleteFilePath)
+    transformation = getViewTransformation(float(centerReal), float(centerImaginary), zoom, width, height)
+    origin = (decimal.Decimal(0), decimal.Decimal(0))
+    reference = None
+    if (isDeepZoom(transformation)):
+        print("Calculating Reference Orbit")
+        transformation = getViewTransformation(0.0, 0.0, zoom, width, height)
+        origin = (centerReal, centerImaginary)
+        reference = createReferenceOrbit(origin, transformation, maxIter)
+    transformationInverse = getTransformationInverse(transformation)
+    dtype = getIterationsDtype(maxIter)
+    bandHeight = renderTileSize
+    startTime = time.time()
+
+    with tempfile.TemporaryFile() as iterationFile, tempfile.TemporaryFile() as smoothFile:
+        iterationMap = np.memmap(iterationFile, dtype = dtype, mode = 'w+', shape = (height, width))
+        smoothMap = np.memmap(smoothFile, dtype = np.float32, mode = 'w+', shape = (height, width))
+        histogram = (np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64))
+        skippedPixels = 0
+        for (y0, bandIterations, bandSmooth, bandSkippedPixels) in renderBands(transformationInverse, width, height, bandHeight, maxIter, reference):
+            iterationMap[y0:y0 + bandIterations.shape[1]] = bandIterations.T
+            smoothMap[y0:y0 + bandIterations.shape[1]] = bandSmooth.T
+            histogram = mergeHistograms(histogram, calculateHistogram(bandIterations))
+            skippedPixels += bandSkippedPixels
+            print("Generating Iteration Map: " + "{:.2f}".format((y0 + bandIterations.shape[1]) / (height * 1.0) * 100.0) + "%")
+
+        if (snapshotPath is not None):
+            writer = SnapshotWriter(snapshotPath, width, height, transformation, maxIter, origin, histogram[0][-1])
+            for y0 in range(0, height, bandHeight):
+                writer.writeRows(iterationMap[y0:y0 + bandHeight], smoothMap[y0:y0 + bandHeight])
+            writer.close()
+            print("Saved " + snapshotPath)
+
+        antialiasedPixels = 0
+        if (outputPath is not None):
+            writer = openImageWriter(outputPath, width, height)
+            for y0 in range(0, height, bandHeight):
+                bandIterations = np.asarray(iterationMap[y0:y0 + bandHeight], dtype = np.int64)
+                colors = calculateColors(calculateHue(bandIterations, smoothMap[y0:y0 + bandHeight], histogram, maxIter, colorMapping), palleteColors)
+                if (antialias):
+                    # The subsamples work on [x][y] colors, the transposed view writes into the rows
+                    columns = colors.transpose(1, 0, 2)
+                    subsamples = calculateSubsamples(columns, 0, y0, transformationInverse, maxIter, reference)
+                    blendSubsamples(columns, subsamples, histogram, maxIter)
+                    antialiasedPixels += len(subsamples[0])
+                writer.writeRows(colors)
+            writer.close()
+            print("Saved " + outputPath)
+        del iterationMap
+        del smoothMap
+
+    if (reference is not None):
+        removeReferenceOrbit(reference)
+    shutdownRenderPool()
+    if (antialias):
+        print("Anti-aliased " + "{:.2f}".format(antialiasedPixels / (width * height * 1.0) * 100.0) + "% of the pixels")
+    if (subdivisionRendering):
+        print("Subdivision skipped " + "{:.2f}".format(skippedPixels / (width * height * 1.0) * 100.0) + "% of the pixels")
+    print("Rendered in " + "{:.2f}".format(time.time() - startTime) + "s")
+    return
+
+# Colors the iteration map of a snapshot into a still image without iterating again
+# The rows are read a band at a time, so a raw snapshot doesn't have to fit in memory
+def recolorSnapshot(snapshotPath, outputPath, palleteFilePath):
+    loadPallete(palleteFilePath)
+    header, records = loadSnapshot(snapshotPath)
+    height, width = records.shape
+    bandHeight = renderTileSize
+    startTime = time.time()
+
+    histogram = (np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64))
+    for y0 in range(0, height, bandHeight):
+        histogram = mergeHistograms(histogram, calculateHistogram(records['iterations'][y0:y0 + bandHeight]))
+
+    writer = openImageWriter(outputPath, width, height)
+    for y0 in range(0, height, bandHeight):
+        band = records[y0:y0 + bandHeight]
+        writer.writeRows(calculateColors(calculateHue(band['iterations'].astype(np.int64), band['smooth'], histogram, header['maxIterations'], colorMapping), palleteColors))
+    writer.close()
+    print("Saved " + outputPath + " in " + "{:.2f}".format(time.time() - startTime) + "s")
+    return
+
+# Zoom of each frame of an animation, the zoom is multiplied by the same factor on every frame
+def getAnimationZooms(zoom, zoomEnd, frames):
+    return [zoom * (zoomEnd / zoom) ** (i / max(frames - 1.0, 1.0)) for i in range(frames)]
+
+# Splits the frames into segments that can be taken from the same key frame, the zoom inside
+# a segment changes at most animationKeyScale times
+# A key frame of n frames costs the pixels of scale ** 2 frames (scale = ratio ** (n - 1)), so when
+# the frames are too far apart for that to pay off every frame is its own key frame
+def getAnimationSegments(zooms):
+    ratio = max(zooms[-1] / zooms[0], zooms[0] / zooms[-1]) ** (1.0 / max(len(zooms) - 1, 1))
+    framesPerKey = len(zooms)
+    if (ratio > 1.0 + 1e-9):
+        framesPerKey = max(1, int(math.log(animationKeyScale) / math.log(ratio) + 1e-9) + 1)
+        if (framesPerKey <= ratio ** (2 * (framesPerKey - 1))):
+            framesPerKey = 1
+    return [range(first, min(first + framesPerKey, len(zooms))) for first in range(0, len(zooms), framesPerKey)]
+
+# Renders a zoom animation into numbered PNG files on a folder, or into a raw RGB24 stream when the
+# output ends with .rgb or .raw (it can also be a named pipe), ready for a video encoder like:
+#   ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 30 -i animation.rgb animation.mp4
+# The key frames are rendered in parallel, one for each worker process
+def renderAnimation(outputPath, centerReal, centerImaginary, zoom, zoomEnd, frames, maxIter, palleteFilePath, width, height):
+    loadPallete(palleteFilePath)
+    rawOutput = outputPath.lower().endswith(('.rgb', '.raw'))
+    zooms = getAnimationZooms(zoom, zoomEnd, frames)
+    segments = getAnimationSegments(zooms)
+    startTime = time.time()
+
+    # All of the key frames share the center, so on deep zoom a single reference orbit with the
+    # precision of the deepest one is enough
+    orbitReference = None
+    deepestTransformation = getViewTransformation(0.0, 0.0, max(zooms) * animationKeyScale, width, height)
+    if (isDeepZoom(deepestTransformation)):
+        print("Calculating Reference Orbit")
+        orbitReference = createReferenceOrbit((centerReal, centerImaginary), deepestTransformation, maxIter)
+
+    if (rawOutput):
+        stream = open(outputPath, 'wb')
+    else:
+        stream = None
+        os.makedirs(outputPath, exist_ok = True)
+
+    # The distributed workers can be on other machines, so they send the frames back to be saved here
+    pool = getRenderPool()
+    workersSaveFrames = not rawOutput and not isinstance(pool, DistributedRenderPool)
+    pending = collections.deque()
+    nextSegment = 0
+    doneFrames = 0
+    keyPixels = 0
+    while (nextSegment < len(segments) or pending):
+        while (nextSegment < len(segments) and len(pending) < 2 + renderWorkers):
+            segment = segments[nextSegment]
+            keyZoom = min([zooms[i] for i in segment])
+            keyScale = max([zooms[i] for i in segment]) / keyZoom
+            keyW, keyH = int(math.ceil(width * keyScale)), int(math.ceil(height * keyScale))
+            transformation = getViewTransformation(float(centerReal), float(centerImaginary), keyZoom * keyW / float(width), keyW, keyH)
+            reference = None
+            if (orbitReference is not None and isDeepZoom(transformation)):
+                transformation = getViewTransformation(0.0, 0.0, keyZoom * keyW / float(width), keyW, keyH)
+                reference = (orbitReference[0], keyW / 2.0, keyH / 2.0)
+            factors = [keyZoom * keyW / float(width) / zooms[i] for i in segment]
+            framePaths = [getAnimationFramePath(outputPath, i) for i in segment] if (workersSaveFrames) else None
+            pending.append((segment, pool.submit(renderAnimationSegment, getTransformationInverse(transformation), keyW, keyH, factors, framePaths,
+                width, height, maxIter, reference, renderEngine, palleteColors, colorMapping)))
+            keyPixels += keyW * keyH
+            nextSegment += 1
+
+        segment, future = pending.popleft()
+        segmentFrames = future.result()
+        if (stream is not None):
+            for frame in segmentFrames:
+                stream.write(frame)
+        elif (not workersSaveFrames):
+            for (i, frame) in zip(segment, segmentFrames):
+                writer = PngWriter(getAnimationFramePath(outputPath, i), width, height)
+                writer.writeRows(np.frombuffer(frame, dtype = np.uint8).reshape(height, width, 3))
+                writer.close()
+        doneFrames += len(segmentFrames)
+        print("Rendering Animation: " + str(doneFrames) + "/" + str(frames) + " frames")
+
+    if (stream is not None):
+        stream.close()
+    if (orbitReference is not None):
+        removeReferenceOrbit(orbitReference)
+    shutdownRenderPool()
+
+    seconds = time.time() - startTime
+    print("Rendered " + str(frames) + " frames from " + str(len(segments)) + " key frames in " + "{:.2f}".format(seconds) + "s - " +
+        "{:.2f}".format(frames / max(seconds, 1e-9)) + " fps - " +
+        "{:.0f}".format(keyPixels / (frames * width * height * 1.0) * 100.0) + "% of the pixels of rendering every frame")
+    return
+
+def getAnimationFramePath(outputPath, frame):
+    return os.path.join(outputPath, 'frame_' + str(frame).zfill(5) + '.png')
+
+# Runs inside the worker processes, renders a key frame of keyW x keyH pixels and takes the frames from it
+# Each frame pixel takes the nearest key frame pixel, the factor is how many key frame pixels there are
+# for each frame pixel, then the frame is colored with its own histogram
+# The frames are saved to the paths or, without paths, returned as raw RGB rows
+# The pallete comes as its colors (see loadPallete), so the workers don't open it
+def renderAnimationSegment(transformationInverse, keyW, keyH, factors, framePaths, width, height, maxIter, reference, engine, palleteColors, mapping):
+    keyIterations, keySmooth = calculateTile(transformationInverse, 0, 0, keyW, keyH, maxIter, 1, None, reference, engine)
+
+    frames = []
+    for (i, factor) in enumerate(factors):
+        columns = np.clip(np.rint(keyW / 2.0 + (np.arange(width) - width / 2.0) * factor), 0, keyW - 1).astype(np.intp)
+        rows = np.clip(np.rint(keyH / 2.0 + (np.arange(height) - height / 2.0) * factor), 0, keyH - 1).astype(np.intp)
+        iterations = keyIterations[columns[:, np.newaxis], rows[np.newaxis, :]]
+        smooth = keySmooth[columns[:, np.newaxis], rows[np.newaxis, :]]
+        colors = calculateColors(calculateHue(iterations, smooth, calculateHistogram(iterations), maxIter, mapping), palleteColors).transpose(1, 0, 2)
+        if (framePaths is not None):
+            writer = PngWriter(framePaths[i], width, height)
+            writer.writeRows(colors)
+            writer.close()
+            frames.append(framePaths[i])
+        else:
+            frames.append(np.ascontiguousarray(colors).tobytes())
+    return frames
+
+# Snapshot file: the magic, the version, the length of the JSON header and the header with the view,
+# then the (iterations, smooth) records of the rows from top to bottom, starting at a multiple of 16 bytes
+# The iterations use the smallest unsigned type that holds the highest count
+def getSnapshotDtype(maxValue):
+    iterationsType = np.uint64
+    for candidate in (np.uint32, np.uint16, np.uint8):
+        if (maxValue <= np.iinfo(candidate).max):
+            iterationsType = candidate
+    return np.dtype([('iterations', iterationsType), ('smooth', np.float32)]).newbyteorder('<')
+
+# Writes a snapshot a band of rows at a time, compressed with zlib when the file ends with .msetz
+class SnapshotWriter:
+    def __init__(self, path, width, height, transformation, maxIter, origin, maxValue):
+        self.dtype = getSnapshotDtype(maxValue)
+        self.compressor = zlib.compressobj(6) if (path.lower().endswith('.msetz')) else None
+        header = json.dumps({
+            'width': width, 'height': height, 'maxIterations': int(maxIter),
+            'transformation': np.asarray(transformation, dtype = np.float64).tolist(),
+            'origin': [str(origin[0]), str(origin[1])],
+            'iterations': self.dtype['iterations'].str,
+            'compression': 'zlib' if (self.compressor is not None) else 'none'}).encode('utf-8')
+        header += b' ' * (-(len(snapshotMagic) + 5 + len(header)) % 16)
+        self.file = open(path, 'wb')
+        self.file.write(snapshotMagic + struct.pack('<BI', snapshotVersion, len(header)) + header)
+
+    # The rows are (h, w) iterations and smooth offsets
+    def writeRows(self, iterations, smooth):
+        rows = np.empty(iterations.shape, dtype = self.dtype)
+        rows['iterations'] = iterations
+        rows['smooth'] = smooth
+        data = rows.tobytes()
+        if (self.compressor is not None):
+            data = self.compressor.compress(data)
+        self.file.write(data)
+
+    def close(self):
+        if (self.compressor is not None):
+            self.file.write(self.compressor.flush())
+        self.file.close()
+
+# Saves a (W, H) iteration map and its smooth offsets with the view they were rendered with
+def saveSnapshot(path, iterationMap, smoothMap, transformation, maxIter, origin):
+    height, width = iterationMap.shape[1], iterationMap.shape[0]
+    writer = SnapshotWriter(path, width, height, transformation, maxIter, origin, int(iterationMap.max()))
+    writer.writeRows(iterationMap.T, smoothMap.T)
+    writer.close()
+    return
+
+# Returns the header and the (H, W) records of a snapshot, the raw ones are memory mapped
+def loadSnapshot(path):
+    with open(path, 'rb') as file:
+        magic = file.read(len(snapshotMagic))
+        version, headerLength = struct.unpack('<BI', file.read(5))
+        if (magic != snapshotMagic or version != snapshotVersion):
+            raise ValueError(path + " isn't a snapshot")
+        header = json.loads(file.read(headerLength).decode('utf-8'))
+        dtype = np.dtype([('iterations', header['iterations']), ('smooth', '<f4')])
+        shape = (header['height'], header['width'])
+        if (header['compression'] == 'zlib'):
+            return (header, np.frombuffer(zlib.decompress(file.read()), dtype = dtype).reshape(shape))
+        offset = file.tell()
+    return (header, np.memmap(path, dtype = dtype, mode = 'r', offset = offset, shape = shape))
+
+def openImageWriter(path, width, height):
+    if (path.lower().endswith('.bmp')):
+        return BmpWriter(path, width, height)
+    return PngWriter(path, width, height)
+
+# Writes a PNG file a band of rows at a time
+class PngWriter:
+    def __init__(self, path, width, height):
+        self.file = open(path, 'wb')
+        self.compressor = zlib.compressobj(6)
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self.writeChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def writeChunk(self, chunkType, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunkType)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(chunkType + data) & 0xffffffff))
+
+    # The rows are (h, w, 3) RGB colors, each one starts with the filter type 0 (none)
+    def writeRows(self, rows):
+        h, w, _ = rows.shape
+        data = np.zeros((h, 1 + w * 3), dtype = np.uint8)
+        data[:, 1:] = rows.reshape(h, w * 3)
+        compressed = self.compressor.compress(data.tobytes())
+        if (compressed):
+            self.writeChunk(b'IDAT', compressed)
+
+    def close(self):
+        self.writeChunk(b'IDAT', self.compressor.flush())
+        self.writeChunk(b'IEND', b'')
+        self.file.close()
+
+# Writes a 24 bits BMP file a band of rows at a time, the negative height makes it top-down
+class BmpWriter:
+    def __init__(self, path, width, height):
+        self.file = open(path, 'wb')
+        self.rowSize = (width * 3 + 3) & ~3
+        imageSize = self.rowSize * height
+        self.file.write(struct.pack('<2sIHHI', b'BM', 54 + imageSize, 0, 0, 54))
+        self.file.write(struct.pack('<IiiHHIIiiII', 40, width, -height, 1, 24, 0, imageSize, 2835, 2835, 0, 0))
+
+    def writeRows(self, rows):
+        h, w, _ = rows.shape
+        data = np.zeros((h, self.rowSize), dtype = np.uint8)
+        data[:, :w * 3] = rows[:, :, ::-1].reshape(h, w * 3)
+        self.file.write(data.tobytes())
+
+    def close(self):
+        self.file.close()
+
 # run the main function only if this module is executed as the main script
 # (if you import this as a module then nothing is executed)
 if __name__=="__main__":
-    # call the main function
-    main()
+    parser = argparse.ArgumentParser(description = 'Mandelbrot Set Fractal Plotting Application')
+    parser.add_argument('--workers', type = int, default = renderWorkers, help = 'number of render processes')
+    parser.add_argument('--output', help = 'render a still image to this PNG/BMP file without opening a window')
+    parser.add_argument('--center', type = decimal.Decimal, nargs = 2, default = [decimal.Decimal('-0.5'), decimal.Decimal(0)], metavar = ('REAL', 'IMAGINARY'), help = 'center of the image, with as many digits as needed for deep zooms')
+    parser.add_argument('--zoom', type = float, default = 2.0, help = 'zoom, the same value shown on the screen')
+    parser.add_argument('--iterations', type = int, default = maxIterations, help = 'max iterations')
+    parser.add_argument('--adaptive', action = 'store_true', help = 'choose the max iterations from the zoom and a sample of the pixels')
+    parser.add_argument('--pallete', default = palleteFilePath, help = 'pallete image')
+    parser.add_argument('--mapping', choices = colorMappings, default = colorMapping, help = 'how the iterations are mapped to the pallete')
+    parser.add_argument('--size', help = 'size of the image as WIDTHxHEIGHT (800x600 for images, 400x300 for the benchmark)')
+    parser.add_argument('--subdivide', action = 'store_true', help = 'use the Mariani-Silver subdivision')
+    parser.add_argument('--antialias', action = 'store_true', help = 'add subsamples to the pixels on edges')
+    parser.add_argument('--engine', choices = list(renderEngines.keys()), default = renderEngine, help = 'render engine')
+    parser.add_argument('--cross-check', action = 'store_true', help = 'check that all of the engines give the same iterations')
+    parser.add_argument('--trace', metavar = 'FILE', help = 'append the timings of every render to this CSV (.csv) or JSON lines file')
+    parser.add_argument('--snapshot', metavar = 'FILE', help = 'open the window on a saved snapshot, or color it into the --output image without rendering')
+    parser.add_argument('--save-snapshot', metavar = 'FILE', help = 'also save the iteration map of the still image (.mset raw, .msetz compressed)')
+    parser.add_argument('--animation', metavar = 'OUTPUT', help = 'render a zoom animation from --zoom to --zoom-end into numbered PNG files on this folder, or a raw RGB24 stream (.rgb or .raw)')
+    parser.add_argument('--zoom-end', type = float, help = 'zoom of the last frame of the animation')
+    parser.add_argument('--frames', type = int, default = 60, help = 'frames of the animation')
+    parser.add_argument('--listen', metavar = 'ADDRESS', help = 'send the tiles to the render workers that connect to this address (host:port or unix:/path) instead of the local processes')
+    parser.add_argument('--worker', metavar = 'ADDRESS', help = 'run --workers render workers for the coordinator at this address')
+    parser.add_argument('--benchmark', metavar = 'JSON', help = 'time the render stages of some known views with every engine and save the results to this file')
+    args = parser.parse_args()
+    renderWorkers = max(1, args.workers)
+    subdivisionRendering = args.subdivide
+    renderEngine = args.engine
+    renderTracePath = args.trace
+    colorMapping = args.mapping
+    palleteFilePath = args.pallete
+    snapshotPath = args.snapshot
+    renderCoordinatorAddress = args.listen
 
+    if (args.worker):
+        runRenderWorkers(args.worker, renderWorkers)
+    elif (args.cross_check):
+        sys.exit(0 if crossCheckEngines(maxIter = args.iterations) else 1)
+    elif (args.benchmark):
+        width, height = [int(v) for v in (args.size or '400x300').lower().split('x')]
+        benchmarkEngines(args.benchmark, width, height, palleteFilePath = args.pallete)
+    elif (args.animation):
+        if (args.zoom_end is None):
+            parser.error('--animation needs --zoom-end')
+        width, height = [int(v) for v in (args.size or '800x600').lower().split('x')]
+        renderAnimation(args.animation, args.center[0], args.center[1], args.zoom, args.zoom_end, max(1, args.frames), args.iterations, args.pallete, width, height)
+    elif (args.output and args.snapshot):
+        recolorSnapshot(args.snapshot, args.output, args.pallete)
+    elif (args.output or args.save_snapshot):
+        width, height = [int(v) for v in (args.size or '800x600').lower().split('x')]
+        maxIter = args.iterations
+        if (args.adaptive):
+            maxIter = calculateAdaptiveIterations(getViewTransformation(float(args.center[0]), float(args.center[1]), args.zoom, width, height), width, height)
+            print("Adaptive Max Iterations: " + str(maxIter))
+        batchRender(args.output, args.center[0], args.center[1], args.zoom, maxIter, args.pallete, width, height, args.save_snapshot, args.antialias)
+    else:
+        # call the main function
+        main()